@@ -0,0 +1,116 @@
+import copy
+import json
+import logging
+import queue
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from pathlib import Path
+from .settings import settings
+
+update_id_var: ContextVar[int] = ContextVar('update_id', default=None)
+user_id_var: ContextVar[int] = ContextVar('user_id', default=None)
+handler_var: ContextVar[str] = ContextVar('handler', default=None)
+tenant_var: ContextVar[str] = ContextVar('tenant', default=None)
+
+class ContextFilter(logging.Filter):
+    # Контекст читается в потоке event loop, до постановки записи в очередь
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.update_id = update_id_var.get()
+        record.user_id = user_id_var.get()
+        record.handler = handler_var.get()
+        record.tenant = tenant_var.get()
+        return True
+
+class DroppingQueueHandler(QueueHandler):
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Подставляем аргументы сразу (они могут измениться), а форматирование
+        # и трейсбек оставляем потоку QueueListener
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        # Переполненная очередь означает, что вывод не успевает: теряем запись,
+        # но не блокируем event loop
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in ("tenant", "update_id", "user_id", "handler"):
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        update_id = getattr(record, "update_id", None)
+        if update_id is not None:
+            line += f" [tenant={record.tenant} update={update_id} user={record.user_id} handler={record.handler}]"
+        return line
+
+def setup_logging() -> QueueListener:
+    formatter = JsonFormatter() if settings.LOG_FORMAT == 'json' else TextFormatter()
+
+    handlers = []
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(formatter)
+    handlers.append(stream_handler)
+
+    if settings.LOG_DIR:
+        log_dir = Path(settings.LOG_DIR)
+        log_dir.mkdir(parents=True, exist_ok=True)
+        file_handler = RotatingFileHandler(
+            log_dir / 'bot.log',
+            maxBytes=settings.LOG_MAX_BYTES,
+            backupCount=settings.LOG_BACKUP_COUNT,
+            encoding='utf-8'
+        )
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+
+    queue_handler = DroppingQueueHandler(queue.Queue(settings.LOG_QUEUE_SIZE))
+    queue_handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    root.handlers.clear()
+    root.addHandler(queue_handler)
+    root.setLevel(settings.LOG_LEVEL)
+
+    # LOG_LEVELS=aiogram.event=WARNING,app.database=DEBUG
+    for item in settings.LOG_LEVELS.split(','):
+        if '=' in item:
+            name, level = item.split('=', 1)
+            logging.getLogger(name.strip()).setLevel(level.strip().upper())
+
+    listener = QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
+
+def dropped_records() -> int:
+    return sum(
+        handler.dropped for handler in logging.getLogger().handlers
+        if isinstance(handler, DroppingQueueHandler)
+    )
@@ -8,10 +8,28 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 
 class Settings:
     TOKEN: str = os.getenv('TOKEN')
-    GROUP_ID: int = int(os.getenv('GROUP_ID'))
+    GROUP_ID: int = int(os.getenv('GROUP_ID') or 0)
+
+    # Несколько редакций в одном процессе: JSON-файл со списком
+    # {"name", "token", "group_id", "welcome_file"}; без него — одна редакция из TOKEN/GROUP_ID
+    TENANTS_FILE: str = os.getenv('TENANTS_FILE', '')
+    # Сколько обновлений одной редакции обрабатывается одновременно:
+    # занятая редакция не забирает весь пул соединений у остальных
+    TENANT_CONCURRENCY: int = int(os.getenv('TENANT_CONCURRENCY', '8'))
     
     # Пути
     WELCOME_FILE: Path = BASE_DIR / 'media' / 'welcome_message.txt'
+
+    # Логирование
+    LOG_LEVEL: str = os.getenv('LOG_LEVEL', 'INFO').upper()
+    # Уровни отдельных модулей: aiogram.event=WARNING,app.database=DEBUG
+    LOG_LEVELS: str = os.getenv('LOG_LEVELS', '')
+    LOG_FORMAT: str = os.getenv('LOG_FORMAT', 'json')
+    # Пустое значение отключает запись в файл
+    LOG_DIR: str = os.getenv('LOG_DIR', str(BASE_DIR.parent / 'logs'))
+    LOG_MAX_BYTES: int = int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+    LOG_BACKUP_COUNT: int = int(os.getenv('LOG_BACKUP_COUNT', '5'))
+    LOG_QUEUE_SIZE: int = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
     
     # База данных
     DB_HOST: str = os.getenv('DB_HOST', 'localhost')
@@ -20,12 +38,82 @@ class Settings:
     DB_USER: str = os.getenv('DB_USER', 'chatl_user')
     DB_PASSWORD: str = os.getenv('DB_PASSWORD', 'change_me')
 
+    # Реплика для чтения: пустой DB_REPLICA_HOST — все запросы идут в основную базу
+    DB_REPLICA_HOST: str = os.getenv('DB_REPLICA_HOST', '')
+    DB_REPLICA_PORT: str = os.getenv('DB_REPLICA_PORT', DB_PORT)
+    # Реплика отстающая дольше REPLICA_MAX_LAG секунд исключается до догона
+    REPLICA_MAX_LAG: float = float(os.getenv('REPLICA_MAX_LAG', '5'))
+    REPLICA_CHECK_INTERVAL: float = float(os.getenv('REPLICA_CHECK_INTERVAL', '1'))
+    # После записи чтения по тому же автору идут в основную базу; окно должно покрывать
+    # допустимое отставание вместе с интервалом проверки
+    REPLICA_STICKY_SECONDS: float = float(os.getenv('REPLICA_STICKY_SECONDS', '6'))
+
     # Time-webовские креды
     TIMEWEB_API_TOKEN: str = os.getenv('TIMEWEB_API_TOKEN', '')
     TIMEWEB_DAILY_COST: float = float(os.getenv('TIMEWEB_DAILY_COST', '50'))
 
+    # Жизненный цикл
+    HEALTH_HOST: str = os.getenv('HEALTH_HOST', '0.0.0.0')
+    HEALTH_PORT: int = int(os.getenv('HEALTH_PORT', '8080'))
+    SHUTDOWN_TIMEOUT: float = float(os.getenv('SHUTDOWN_TIMEOUT', '20'))
+
+    # Outbox: direct — отправка сразу, в outbox только при временной ошибке;
+    # outbox — обработчик только записывает намерение, отправляют воркеры
+    RELAY_MODE: str = os.getenv('RELAY_MODE', 'direct')
+    OUTBOX_WORKERS: int = int(os.getenv('OUTBOX_WORKERS', '2'))
+    OUTBOX_BATCH_SIZE: int = int(os.getenv('OUTBOX_BATCH_SIZE', '10'))
+    OUTBOX_MAX_ATTEMPTS: int = int(os.getenv('OUTBOX_MAX_ATTEMPTS', '10'))
+    OUTBOX_BASE_DELAY: float = float(os.getenv('OUTBOX_BASE_DELAY', '2'))
+    OUTBOX_MAX_DELAY: float = float(os.getenv('OUTBOX_MAX_DELAY', '600'))
+    OUTBOX_POLL_INTERVAL: float = float(os.getenv('OUTBOX_POLL_INTERVAL', '5'))
+    OUTBOX_LEASE_SECONDS: float = float(os.getenv('OUTBOX_LEASE_SECONDS', '60'))
+    # Отправленные записи удаляются через OUTBOX_RETENTION_HOURS; failed остаются для разбора
+    OUTBOX_RETENTION_HOURS: float = float(os.getenv('OUTBOX_RETENTION_HOURS', '24'))
+    OUTBOX_PURGE_INTERVAL: float = float(os.getenv('OUTBOX_PURGE_INTERVAL', '3600'))
+    OUTBOX_PURGE_BATCH: int = int(os.getenv('OUTBOX_PURGE_BATCH', '5000'))
+
+    # Антифлуд для личных сообщений
+    THROTTLE_RATE: float = float(os.getenv('THROTTLE_RATE', '1'))
+    THROTTLE_BURST: int = int(os.getenv('THROTTLE_BURST', '10'))
+    THROTTLE_MUTE_AFTER: int = int(os.getenv('THROTTLE_MUTE_AFTER', '20'))
+    THROTTLE_MUTE_SECONDS: float = float(os.getenv('THROTTLE_MUTE_SECONDS', '600'))
+    THROTTLE_MAX_USERS: int = int(os.getenv('THROTTLE_MAX_USERS', '100000'))
+
+    # Мониторинг event loop
+    LOOP_MONITOR_INTERVAL: float = float(os.getenv('LOOP_MONITOR_INTERVAL', '0.5'))
+    LOOP_STALL_THRESHOLD: float = float(os.getenv('LOOP_STALL_THRESHOLD', '0.25'))
+    LOOP_DEBUG: bool = os.getenv('LOOP_DEBUG', 'false').lower() == 'true'
+
+    # Профилирование по команде /profile
+    PROFILE_HZ: int = int(os.getenv('PROFILE_HZ', '100'))
+    PROFILE_MAX_SECONDS: int = int(os.getenv('PROFILE_MAX_SECONDS', '120'))
+    PROFILE_COOLDOWN: float = float(os.getenv('PROFILE_COOLDOWN', '600'))
+
+    # Рассылка /broadcast: общий лимит Bot API ~30 сообщений в секунду,
+    # часть оставляем обычной пересылке
+    BROADCAST_RATE: float = float(os.getenv('BROADCAST_RATE', '20'))
+    BROADCAST_BATCH_SIZE: int = int(os.getenv('BROADCAST_BATCH_SIZE', '500'))
+    BROADCAST_CHECKPOINT_EVERY: int = int(os.getenv('BROADCAST_CHECKPOINT_EVERY', '50'))
+    BROADCAST_PROGRESS_INTERVAL: float = float(os.getenv('BROADCAST_PROGRESS_INTERVAL', '15'))
+    BROADCAST_MAX_ATTEMPTS: int = int(os.getenv('BROADCAST_MAX_ATTEMPTS', '5'))
+
+    # Правки редакции: переносятся автору после паузы, но не позже EDIT_MAX_DELAY от первой
+    EDIT_QUIET_PERIOD: float = float(os.getenv('EDIT_QUIET_PERIOD', '3'))
+    EDIT_MAX_DELAY: float = float(os.getenv('EDIT_MAX_DELAY', '30'))
+
+    # Если к запуску накопилось не меньше BACKLOG_THRESHOLD обновлений, они обрабатываются
+    # пачками по BACKLOG_BATCH_SIZE (не больше 100) с общими запросами к БД
+    BACKLOG_THRESHOLD: int = int(os.getenv('BACKLOG_THRESHOLD', '50'))
+    BACKLOG_BATCH_SIZE: int = int(os.getenv('BACKLOG_BATCH_SIZE', '100'))
+
     @property
     def DATABASE_URL(self) -> str:
         return f"postgresql+asyncpg://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
 
+    @property
+    def REPLICA_DATABASE_URL(self) -> str:
+        if not self.DB_REPLICA_HOST:
+            return None
+        return f"postgresql+asyncpg://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_REPLICA_HOST}:{self.DB_REPLICA_PORT}/{self.DB_NAME}"
+
 settings = Settings()
\ No newline at end of file
@@ -0,0 +1,40 @@
+import asyncio
+import json
+from pathlib import Path
+from .settings import settings, BASE_DIR
+
+class Tenant:
+    def __init__(self, name: str, token: str, group_id: int, welcome_file: Path):
+        self.name = name
+        self.token = token
+        self.group_id = group_id
+        self.welcome_file = welcome_file
+        self.semaphore = asyncio.Semaphore(settings.TENANT_CONCURRENCY)
+        # Заполняются при запуске в main
+        self.bot = None
+        self.edits = None
+        self.broadcasts = None
+
+def load_tenants() -> list[Tenant]:
+    if not settings.TENANTS_FILE:
+        if not settings.TOKEN or not settings.GROUP_ID:
+            raise ValueError("Укажите TOKEN и GROUP_ID или TENANTS_FILE")
+        return [Tenant("default", settings.TOKEN, settings.GROUP_ID, settings.WELCOME_FILE)]
+
+    with open(settings.TENANTS_FILE, encoding='utf-8') as f:
+        items = json.load(f)
+
+    tenants = []
+    for item in items:
+        welcome_file = Path(item["welcome_file"]) if item.get("welcome_file") else settings.WELCOME_FILE
+        if not welcome_file.is_absolute():
+            welcome_file = BASE_DIR / welcome_file
+        tenants.append(Tenant(item["name"], item["token"], int(item["group_id"]), welcome_file))
+
+    if not tenants:
+        raise ValueError(f"В {settings.TENANTS_FILE} нет ни одной редакции")
+    for field in ("name", "token", "group_id"):
+        values = [getattr(tenant, field) for tenant in tenants]
+        if len(set(values)) != len(values):
+            raise ValueError(f"В {settings.TENANTS_FILE} повторяется {field}")
+    return tenants
@@ -1,5 +1,5 @@
-from .engine import engine, AsyncSessionLocal
-from .models import Base, BannedUser, MessageMapping, LastEditorReply
+from .engine import engine, AsyncSessionLocal, read_router
+from .models import Base, BannedUser, MessageMapping, LastEditorReply, OutboxMessage, Broadcast
 from .crud import (
     init_db,
     add_banned_user,
@@ -7,27 +7,64 @@ from .crud import (
     is_user_banned,
     get_all_banned_users,
     add_message_mapping,
+    add_message_mappings,
     get_message_mapping,
+    get_mapping_inline_header,
     get_user_message_mapping,
     set_last_editor_reply,
-    get_last_editor_reply
+    get_last_editor_reply,
+    load_lookup_batch,
+    add_outbox_message,
+    count_outbox_queues,
+    claim_outbox_messages,
+    complete_outbox_message,
+    retry_outbox_message,
+    fail_outbox_message,
+    purge_sent_outbox,
+    count_pending_outbox,
+    count_broadcast_recipients,
+    iter_broadcast_recipients,
+    create_broadcast,
+    get_active_broadcast,
+    update_broadcast_progress,
+    finish_broadcast
 )
 
 __all__ = [
     'engine',
     'AsyncSessionLocal',
+    'read_router',
     'Base',
     'BannedUser',
     'MessageMapping',
     'LastEditorReply',
+    'OutboxMessage',
+    'Broadcast',
     'init_db',
     'add_banned_user',
     'remove_banned_user',
     'is_user_banned',
     'get_all_banned_users',
     'add_message_mapping',
+    'add_message_mappings',
     'get_message_mapping',
+    'get_mapping_inline_header',
     'get_user_message_mapping',
     'set_last_editor_reply',
-    'get_last_editor_reply'
+    'get_last_editor_reply',
+    'load_lookup_batch',
+    'add_outbox_message',
+    'count_outbox_queues',
+    'claim_outbox_messages',
+    'complete_outbox_message',
+    'retry_outbox_message',
+    'fail_outbox_message',
+    'purge_sent_outbox',
+    'count_pending_outbox',
+    'count_broadcast_recipients',
+    'iter_broadcast_recipients',
+    'create_broadcast',
+    'get_active_broadcast',
+    'update_broadcast_progress',
+    'finish_broadcast'
 ]
\ No newline at end of file
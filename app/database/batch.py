@@ -0,0 +1,40 @@
+from contextvars import ContextVar
+
+class LookupBatch:
+    # Выборки для пачки накопившихся обновлений одной редакции: баны, последние ответы
+    # и маппинги загружаются заранее одним запросом на таблицу, новые маппинги
+    # копятся и записываются одной вставкой в конце пачки
+    def __init__(self, group_id: int):
+        self.group_id = group_id
+        self.active = True
+        # Ключ есть в словаре — ответ окончательный, в том числе «не найдено»
+        self.banned: dict[int, bool] = {}
+        self.last_replies: dict[int, int] = {}
+        self.by_group: dict[int, dict] = {}
+        self.by_user: dict[tuple[int, int], int] = {}
+        self.new_mappings: list[dict] = []
+
+    def add_mapping(self, group_message_id: int, user_id: int, user_message_id: int, inline_header: bool = None):
+        self.new_mappings.append({
+            "group_message_id": group_message_id,
+            "user_id": user_id,
+            "user_message_id": user_message_id,
+            "inline_header": inline_header
+        })
+        self.by_group[group_message_id] = {
+            "user_id": user_id, "user_message_id": user_message_id, "inline_header": inline_header
+        }
+        # Как и в запросе к базе: на сообщение автора берём последнюю копию в группе
+        current = self.by_user.get((user_id, user_message_id))
+        if current is None or group_message_id > current:
+            self.by_user[(user_id, user_message_id)] = group_message_id
+
+lookup_batch_var: ContextVar[LookupBatch] = ContextVar("lookup_batch", default=None)
+
+def current_batch(group_id: int) -> LookupBatch:
+    # Фоновые задачи, созданные обработчиком, наследуют контекст и могут
+    # пережить пачку — после её записи кэш уже не используется
+    batch = lookup_batch_var.get()
+    if batch is not None and batch.active and batch.group_id == group_id:
+        return batch
+    return None
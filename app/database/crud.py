@@ -1,8 +1,12 @@
 import logging
-from datetime import datetime
-from sqlalchemy import select, delete, text
-from .engine import engine, AsyncSessionLocal
-from .models import Base, BannedUser, MessageMapping, LastEditorReply
+from datetime import datetime, timedelta
+from sqlalchemy import select, delete, update, exists, func, text, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import aliased
+from .batch import LookupBatch, current_batch
+from .engine import engine, AsyncSessionLocal, read_router
+from .models import Base, BannedUser, MessageMapping, LastEditorReply, OutboxMessage, Broadcast
+from .migrations import pending_migrations
 
 logger = logging.getLogger(__name__)
 
@@ -19,142 +23,586 @@ async def init_db():
                 "SELECT table_name FROM information_schema.tables WHERE table_schema = 'public'"
             ))
             tables = [row[0] for row in result]
-            logger.info(f"Таблицы в БД: {tables}")
+            logger.info("Таблицы в БД: %s", tables)
+
+        async with engine.connect() as conn:
+            pending = await pending_migrations(conn)
+        if pending:
+            raise RuntimeError(
+                f"Таблицы {', '.join(pending)} в старой схеме. "
+                f"Выполните: python -m app.database.migrations"
+            )
             
     except Exception as e:
-        logger.error(f"Ошибка при инициализации БД: {e}")
+        logger.error("Ошибка при инициализации БД: %s", e)
         raise
 
-async def add_banned_user(user_id: int, banned_by: int = None):
+async def add_banned_user(group_id: int, user_id: int, banned_by: int = None):
     async with AsyncSessionLocal() as session:
         try:
-            existing = await session.execute(
-                select(BannedUser).where(BannedUser.user_id == user_id)
+            result = await session.execute(
+                insert(BannedUser)
+                .values(group_id=group_id, user_id=user_id, banned_by=banned_by, banned_at=datetime.now())
+                .on_conflict_do_nothing(index_elements=[BannedUser.group_id, BannedUser.user_id])
             )
-            if not existing.scalar_one_or_none():
-                banned_user = BannedUser(user_id=user_id, banned_by=banned_by)
-                session.add(banned_user)
-                await session.commit()
-                logger.info(f"Пользователь {user_id} добавлен в бан-лист")
-                return True
-            return False
+            await session.commit()
+            read_router.mark_write((group_id, user_id), (group_id,))
+            batch = current_batch(group_id)
+            if batch:
+                batch.banned[user_id] = True
+            added = result.rowcount > 0
+            if added:
+                logger.info("Пользователь %s добавлен в бан-лист редакции %s", user_id, group_id)
+            return added
         except Exception as e:
             await session.rollback()
-            logger.error(f"Ошибка при добавлении в бан: {e}")
+            logger.error("Ошибка при добавлении в бан: %s", e)
             return False
 
-async def remove_banned_user(user_id: int):
+async def remove_banned_user(group_id: int, user_id: int):
     async with AsyncSessionLocal() as session:
         try:
             result = await session.execute(
-                delete(BannedUser).where(BannedUser.user_id == user_id)
+                delete(BannedUser).where(BannedUser.group_id == group_id, BannedUser.user_id == user_id)
             )
             await session.commit()
+            read_router.mark_write((group_id, user_id), (group_id,))
+            batch = current_batch(group_id)
+            if batch:
+                batch.banned[user_id] = False
             removed = result.rowcount > 0
             if removed:
-                logger.info(f"Пользователь {user_id} удалён из бан-листа")
+                logger.info("Пользователь %s удалён из бан-листа редакции %s", user_id, group_id)
             return removed
         except Exception as e:
             await session.rollback()
-            logger.error(f"Ошибка при удалении из бана: {e}")
+            logger.error("Ошибка при удалении из бана: %s", e)
             return False
 
-async def is_user_banned(user_id: int) -> bool:
+async def is_user_banned(group_id: int, user_id: int) -> bool:
+    batch = current_batch(group_id)
+    if batch and user_id in batch.banned:
+        return batch.banned[user_id]
+
+    async def query(session):
+        result = await session.execute(
+            select(BannedUser.user_id).where(BannedUser.group_id == group_id, BannedUser.user_id == user_id)
+        )
+        return result.scalar_one_or_none() is not None
+
+    try:
+        return await read_router.read((group_id, user_id), query)
+    except Exception as e:
+        logger.error("Ошибка при проверке бана: %s", e)
+        return False
+
+async def get_all_banned_users(group_id: int):
+    async def query(session):
+        result = await session.execute(select(BannedUser.user_id).where(BannedUser.group_id == group_id))
+        return {row[0] for row in result.all()}
+
+    try:
+        return await read_router.read((group_id,), query)
+    except Exception as e:
+        logger.error("Ошибка при получении списка банов: %s", e)
+        return set()
+
+async def add_message_mapping(group_id: int, group_message_id: int, user_id: int, user_message_id: int,
+                              inline_header: bool = None):
+    batch = current_batch(group_id)
+    if batch:
+        # Запишется вместе с остальными маппингами пачки в add_message_mappings
+        batch.add_mapping(group_message_id, user_id, user_message_id, inline_header)
+        return
+
     async with AsyncSessionLocal() as session:
         try:
-            result = await session.execute(
-                select(BannedUser).where(BannedUser.user_id == user_id)
+            # Повторная доставка из outbox не должна падать на уже сохранённом маппинге
+            await session.execute(
+                insert(MessageMapping)
+                .values(
+                    group_id=group_id,
+                    group_message_id=group_message_id,
+                    user_id=user_id,
+                    user_message_id=user_message_id,
+                    inline_header=inline_header,
+                    created_at=datetime.now()
+                )
+                .on_conflict_do_nothing(index_elements=[MessageMapping.group_id, MessageMapping.group_message_id])
             )
-            return result.scalar_one_or_none() is not None
+            await session.commit()
+            read_router.mark_write((group_id, user_id))
+            logger.debug("Добавлен маппинг: %s -> %s:%s", group_message_id, user_id, user_message_id)
         except Exception as e:
-            logger.error(f"Ошибка при проверке бана: {e}")
-            return False
+            await session.rollback()
+            logger.error("Ошибка при добавлении маппинга: %s", e)
 
-async def get_all_banned_users():
+async def add_message_mappings(group_id: int, mappings: list[dict]) -> bool:
+    if not mappings:
+        return True
     async with AsyncSessionLocal() as session:
         try:
-            result = await session.execute(select(BannedUser.user_id))
-            return {row[0] for row in result.all()}
+            now = datetime.now()
+            await session.execute(
+                insert(MessageMapping)
+                .values([{**mapping, "group_id": group_id, "created_at": now} for mapping in mappings])
+                .on_conflict_do_nothing(index_elements=[MessageMapping.group_id, MessageMapping.group_message_id])
+            )
+            await session.commit()
+            read_router.mark_write(*{(group_id, mapping["user_id"]) for mapping in mappings})
+            logger.debug("Добавлено маппингов: %s", len(mappings))
+            return True
         except Exception as e:
-            logger.error(f"Ошибка при получении списка банов: {e}")
-            return set()
+            await session.rollback()
+            logger.error("Ошибка при добавлении %s маппингов: %s", len(mappings), e)
+            return False
+
+async def get_message_mapping(group_id: int, group_message_id: int):
+    batch = current_batch(group_id)
+    if batch and group_message_id in batch.by_group:
+        return batch.by_group[group_message_id]
+
+    async def query(session):
+        result = await session.execute(
+            select(MessageMapping.user_id, MessageMapping.user_message_id)
+            .where(MessageMapping.group_id == group_id, MessageMapping.group_message_id == group_message_id)
+        )
+        mapping = result.one_or_none()
+        if mapping:
+            return {
+                "user_id": mapping.user_id,
+                "user_message_id": mapping.user_message_id
+            }
+        return None
+
+    try:
+        # Автор заранее неизвестен, поэтому вместо «липкости» — повтор в основной базе,
+        # если только что сохранённый маппинг ещё не доехал до реплики
+        return await read_router.read(None, query, fallback_on_miss=True)
+    except Exception as e:
+        logger.error("Ошибка при получении маппинга: %s", e)
+        return None
+
+async def get_mapping_inline_header(group_id: int, group_message_id: int) -> bool:
+    # Отдельно от get_message_mapping: колонки нет в покрывающем индексе, а нужна она только правкам
+    batch = current_batch(group_id)
+    mapping = batch.by_group.get(group_message_id) if batch else None
+    if mapping and "inline_header" in mapping:
+        return mapping["inline_header"]
+
+    async def query(session):
+        result = await session.execute(
+            select(MessageMapping.inline_header)
+            .where(MessageMapping.group_id == group_id, MessageMapping.group_message_id == group_message_id)
+        )
+        return result.scalar_one_or_none()
+
+    try:
+        return await read_router.read(None, query, fallback_on_miss=True)
+    except Exception as e:
+        logger.error("Ошибка при получении вида шапки: %s", e)
+        return None
+
+async def get_user_message_mapping(group_id: int, user_id: int, user_message_id: int):
+    batch = current_batch(group_id)
+    if batch and (user_id, user_message_id) in batch.by_user:
+        return batch.by_user[(user_id, user_message_id)]
 
-async def add_message_mapping(group_message_id: int, user_id: int, user_message_id: int):
+    async def query(session):
+        # На одно сообщение автора в группе может быть шапка и копия: берём копию, она отправлена последней
+        result = await session.execute(
+            select(MessageMapping.group_message_id)
+            .where(
+                MessageMapping.group_id == group_id,
+                MessageMapping.user_id == user_id,
+                MessageMapping.user_message_id == user_message_id
+            )
+            .order_by(MessageMapping.group_message_id.desc())
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
+
+    try:
+        return await read_router.read((group_id, user_id), query, fallback_on_miss=True)
+    except Exception as e:
+        logger.error("Ошибка при получении маппинга по user: %s", e)
+        return None
+
+async def set_last_editor_reply(group_id: int, user_id: int, group_message_id: int):
     async with AsyncSessionLocal() as session:
         try:
-            mapping = MessageMapping(
-                group_message_id=group_message_id,
-                user_id=user_id,
-                user_message_id=user_message_id
+            now = datetime.now()
+            await session.execute(
+                insert(LastEditorReply)
+                .values(group_id=group_id, user_id=user_id, last_group_message_id=group_message_id, updated_at=now)
+                .on_conflict_do_update(
+                    index_elements=[LastEditorReply.group_id, LastEditorReply.user_id],
+                    set_={"last_group_message_id": group_message_id, "updated_at": now}
+                )
             )
-            session.add(mapping)
             await session.commit()
-            logger.debug(f"Добавлен маппинг: {group_message_id} -> {user_id}:{user_message_id}")
+            read_router.mark_write((group_id, user_id))
+            batch = current_batch(group_id)
+            if batch:
+                batch.last_replies[user_id] = group_message_id
+            logger.debug("Обновлён последний ответ для %s: %s", user_id, group_message_id)
         except Exception as e:
             await session.rollback()
-            logger.error(f"Ошибка при добавлении маппинга: {e}")
+            logger.error("Ошибка при установке последнего ответа: %s", e)
+
+async def get_last_editor_reply(group_id: int, user_id: int):
+    batch = current_batch(group_id)
+    if batch and user_id in batch.last_replies:
+        return batch.last_replies[user_id]
+
+    async def query(session):
+        result = await session.execute(
+            select(LastEditorReply.last_group_message_id)
+            .where(LastEditorReply.group_id == group_id, LastEditorReply.user_id == user_id)
+        )
+        return result.scalar_one_or_none()
+
+    try:
+        return await read_router.read((group_id, user_id), query)
+    except Exception as e:
+        logger.error("Ошибка при получении последнего ответа: %s", e)
+        return None
 
-async def get_message_mapping(group_message_id: int):
+async def load_lookup_batch(group_id: int, user_ids: set[int], user_messages: set[tuple[int, int]],
+                            group_message_ids: set[int]) -> LookupBatch:
+    # Одна выборка на таблицу вместо запросов на каждое обновление. Читаем из основной базы:
+    # после простоя реплика может ещё догонять. При ошибке кэш остаётся пустым и
+    # обработчики идут в базу поштучно, как обычно
+    batch = LookupBatch(group_id)
     async with AsyncSessionLocal() as session:
         try:
+            if user_ids:
+                result = await session.execute(
+                    select(BannedUser.user_id)
+                    .where(BannedUser.group_id == group_id, BannedUser.user_id.in_(user_ids))
+                )
+                banned = {row[0] for row in result}
+                result = await session.execute(
+                    select(LastEditorReply.user_id, LastEditorReply.last_group_message_id)
+                    .where(LastEditorReply.group_id == group_id, LastEditorReply.user_id.in_(user_ids))
+                )
+                last_replies = dict(result.tuples().all())
+            else:
+                banned, last_replies = set(), {}
+
+            by_user = {}
+            if user_messages:
+                result = await session.execute(
+                    select(MessageMapping.user_id, MessageMapping.user_message_id, func.max(MessageMapping.group_message_id))
+                    .where(
+                        MessageMapping.group_id == group_id,
+                        tuple_(MessageMapping.user_id, MessageMapping.user_message_id).in_(user_messages)
+                    )
+                    .group_by(MessageMapping.user_id, MessageMapping.user_message_id)
+                )
+                by_user = {(user_id, user_message_id): group_message_id
+                           for user_id, user_message_id, group_message_id in result}
+
+            by_group = {}
+            if group_message_ids:
+                result = await session.execute(
+                    select(MessageMapping.group_message_id, MessageMapping.user_id, MessageMapping.user_message_id)
+                    .where(MessageMapping.group_id == group_id, MessageMapping.group_message_id.in_(group_message_ids))
+                )
+                by_group = {row.group_message_id: {"user_id": row.user_id, "user_message_id": row.user_message_id}
+                            for row in result}
+        except Exception as e:
+            logger.error("Ошибка при загрузке выборок для пачки обновлений: %s", e)
+            return batch
+
+    batch.banned = {user_id: user_id in banned for user_id in user_ids}
+    batch.last_replies = {user_id: last_replies.get(user_id) for user_id in user_ids}
+    batch.by_user = {key: by_user.get(key) for key in user_messages}
+    batch.by_group = {key: by_group.get(key) for key in group_message_ids}
+    return batch
+
+async def add_outbox_message(group_id: int, idempotency_key: str, method: str, payload: dict,
+                             attempts: int = 0, next_attempt_at: datetime = None, last_error: str = None) -> bool:
+    async with AsyncSessionLocal() as session:
+        try:
+            stmt = insert(OutboxMessage).values(
+                group_id=group_id,
+                idempotency_key=idempotency_key,
+                method=method,
+                payload=payload,
+                status='pending',
+                attempts=attempts,
+                next_attempt_at=next_attempt_at or datetime.now(),
+                last_error=last_error,
+                created_at=datetime.now()
+            ).on_conflict_do_nothing(index_elements=[OutboxMessage.idempotency_key])
+            result = await session.execute(stmt)
+            await session.commit()
+            added = result.rowcount > 0
+            if added:
+                logger.debug("Добавлено в outbox: %s", idempotency_key)
+            return added
+        except Exception as e:
+            await session.rollback()
+            logger.error("Ошибка при добавлении в outbox: %s", e)
+            return False
+
+def _outbox_queue(model) -> tuple:
+    # Очередь доставки — чат получателя и автор: внутри неё записи уходят строго по порядку
+    return (
+        model.group_id,
+        model.payload["params"]["chat_id"].as_string(),
+        model.payload["mapping"]["user_id"].as_string()
+    )
+
+async def count_outbox_queues() -> dict[tuple, int]:
+    async with AsyncSessionLocal() as session:
+        try:
+            queue = _outbox_queue(OutboxMessage)
             result = await session.execute(
-                select(MessageMapping).where(MessageMapping.group_message_id == group_message_id)
-            )
-            mapping = result.scalar_one_or_none()
-            if mapping:
-                return {
-                    "user_id": mapping.user_id,
-                    "user_message_id": mapping.user_message_id
-                }
-            return None
+                select(*queue, func.count())
+                .where(OutboxMessage.status.in_(('pending', 'sending')))
+                .group_by(*queue)
+            )
+            return {(group_id, chat_id, user_id): count for group_id, chat_id, user_id, count in result}
         except Exception as e:
-            logger.error(f"Ошибка при получении маппинга: {e}")
-            return None
+            logger.error("Ошибка при подсчёте очередей outbox: %s", e)
+            return {}
+
+async def claim_outbox_messages(limit: int, lease_seconds: float) -> list[dict]:
+    # Записи в статусе sending с истёкшей арендой забираются повторно:
+    # так переживаем падение воркера посреди отправки.
+    # Из каждой очереди берётся только первая незавершённая запись: следующая ждёт её
+    # доставки или окончательного отказа, поэтому ни повтор с задержкой, ни параллельные
+    # воркеры не меняют порядок сообщений одного автора
+    async with AsyncSessionLocal() as session:
+        try:
+            now = datetime.now()
+            earlier = aliased(OutboxMessage)
+            due = (
+                select(OutboxMessage.id)
+                .where(
+                    OutboxMessage.status.in_(('pending', 'sending')),
+                    OutboxMessage.next_attempt_at <= now,
+                    ~exists().where(
+                        earlier.status.in_(('pending', 'sending')),
+                        earlier.id < OutboxMessage.id,
+                        *(a.is_not_distinct_from(b) for a, b in zip(_outbox_queue(earlier), _outbox_queue(OutboxMessage)))
+                    )
+                )
+                .order_by(OutboxMessage.next_attempt_at)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            )
+            result = await session.execute(
+                update(OutboxMessage)
+                .where(OutboxMessage.id.in_(due))
+                .values(status='sending', next_attempt_at=now + timedelta(seconds=lease_seconds))
+                .returning(
+                    OutboxMessage.id,
+                    OutboxMessage.group_id,
+                    OutboxMessage.idempotency_key,
+                    OutboxMessage.method,
+                    OutboxMessage.payload,
+                    OutboxMessage.attempts
+                )
+            )
+            rows = [dict(row._mapping) for row in result.all()]
+            await session.commit()
+            return rows
+        except Exception as e:
+            await session.rollback()
+            logger.error("Ошибка при выборке из outbox: %s", e)
+            return []
+
+async def complete_outbox_message(outbox_id: int):
+    async with AsyncSessionLocal() as session:
+        try:
+            await session.execute(
+                update(OutboxMessage)
+                .where(OutboxMessage.id == outbox_id)
+                .values(status='sent', sent_at=datetime.now(), last_error=None)
+            )
+            await session.commit()
+        except Exception as e:
+            await session.rollback()
+            logger.error("Ошибка при завершении записи outbox %s: %s", outbox_id, e)
+
+async def retry_outbox_message(outbox_id: int, attempts: int, next_attempt_at: datetime, error: str, payload: dict):
+    async with AsyncSessionLocal() as session:
+        try:
+            await session.execute(
+                update(OutboxMessage)
+                .where(OutboxMessage.id == outbox_id)
+                .values(
+                    status='pending',
+                    attempts=attempts,
+                    next_attempt_at=next_attempt_at,
+                    last_error=error,
+                    payload=payload
+                )
+            )
+            await session.commit()
+        except Exception as e:
+            await session.rollback()
+            logger.error("Ошибка при переносе записи outbox %s: %s", outbox_id, e)
+
+async def fail_outbox_message(outbox_id: int, attempts: int, error: str):
+    async with AsyncSessionLocal() as session:
+        try:
+            await session.execute(
+                update(OutboxMessage)
+                .where(OutboxMessage.id == outbox_id)
+                .values(status='failed', attempts=attempts, last_error=error)
+            )
+            await session.commit()
+        except Exception as e:
+            await session.rollback()
+            logger.error("Ошибка при отметке записи outbox %s: %s", outbox_id, e)
+
+async def purge_sent_outbox(sent_before: datetime, limit: int) -> int:
+    # Удаляем ограниченными порциями: короткие транзакции не держат блокировки и не раздувают WAL
+    async with AsyncSessionLocal() as session:
+        try:
+            batch = (
+                select(OutboxMessage.id)
+                .where(OutboxMessage.status == 'sent', OutboxMessage.sent_at < sent_before)
+                .limit(limit)
+            )
+            result = await session.execute(delete(OutboxMessage).where(OutboxMessage.id.in_(batch)))
+            await session.commit()
+            return result.rowcount
+        except Exception as e:
+            await session.rollback()
+            logger.error("Ошибка при очистке outbox: %s", e)
+            return 0
 
-async def get_user_message_mapping(user_id: int, user_message_id: int):
+async def count_pending_outbox() -> int:
     async with AsyncSessionLocal() as session:
         try:
             result = await session.execute(
-                select(MessageMapping).where(
-                    MessageMapping.user_id == user_id,
-                    MessageMapping.user_message_id == user_message_id
+                select(func.count()).select_from(OutboxMessage).where(
+                    OutboxMessage.status.in_(('pending', 'sending'))
                 )
             )
-            mapping = result.scalar_one_or_none()
-            return mapping.group_message_id if mapping else None
+            return result.scalar_one()
         except Exception as e:
-            logger.error(f"Ошибка при получении маппинга по user: {e}")
-            return None
+            logger.error("Ошибка при подсчёте outbox: %s", e)
+            return 0
 
-async def set_last_editor_reply(user_id: int, group_message_id: int):
+def _broadcast_recipients(group_id: int, after_user_id: int):
+    return (
+        select(MessageMapping.user_id)
+        .distinct()
+        .where(
+            MessageMapping.group_id == group_id,
+            MessageMapping.user_id > after_user_id,
+            ~exists().where(BannedUser.group_id == group_id, BannedUser.user_id == MessageMapping.user_id)
+        )
+    )
+
+async def count_broadcast_recipients(group_id: int) -> int:
     async with AsyncSessionLocal() as session:
         try:
             result = await session.execute(
-                select(LastEditorReply).where(LastEditorReply.user_id == user_id)
+                select(func.count()).select_from(_broadcast_recipients(group_id, 0).subquery())
             )
-            existing = result.scalar_one_or_none()
-            
-            if existing:
-                existing.last_group_message_id = group_message_id
-                existing.updated_at = datetime.now()
-            else:
-                reply = LastEditorReply(user_id=user_id, last_group_message_id=group_message_id)
-                session.add(reply)
-            
+            return result.scalar_one()
+        except Exception as e:
+            logger.error("Ошибка при подсчёте получателей рассылки: %s", e)
+            return 0
+
+async def iter_broadcast_recipients(group_id: int, after_user_id: int, batch_size: int):
+    # Авторы выбираются страницами по batch_size с места остановки (keyset по user_id).
+    # Страница читается целиком и соединение возвращается в пул до отправки: рассылка идёт
+    # в темпе Bot API, и открытая на это время транзакция держала бы снимок и мешала VACUUM
+    while True:
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                _broadcast_recipients(group_id, after_user_id).order_by(MessageMapping.user_id).limit(batch_size)
+            )
+            user_ids = list(result.scalars())
+        if not user_ids:
+            return
+        after_user_id = user_ids[-1]
+        yield user_ids
+        if len(user_ids) < batch_size:
+            return
+
+async def create_broadcast(source_chat_id: int, source_message_id: int, status_chat_id: int,
+                           status_message_id: int, total: int, created_by: int = None):
+    async with AsyncSessionLocal() as session:
+        try:
+            broadcast = Broadcast(
+                source_chat_id=source_chat_id,
+                source_message_id=source_message_id,
+                status_chat_id=status_chat_id,
+                status_message_id=status_message_id,
+                status='running',
+                total=total,
+                created_by=created_by,
+                created_at=datetime.now()
+            )
+            session.add(broadcast)
             await session.commit()
-            logger.debug(f"Обновлён последний ответ для {user_id}: {group_message_id}")
+            logger.info("Создана рассылка %s на %s получателей", broadcast.id, total)
+            return _broadcast_dict(broadcast)
         except Exception as e:
             await session.rollback()
-            logger.error(f"Ошибка при установке последнего ответа: {e}")
+            logger.error("Ошибка при создании рассылки: %s", e)
+            return None
 
-async def get_last_editor_reply(user_id: int):
+async def get_active_broadcast(group_id: int):
     async with AsyncSessionLocal() as session:
         try:
             result = await session.execute(
-                select(LastEditorReply).where(LastEditorReply.user_id == user_id)
+                select(Broadcast)
+                .where(Broadcast.source_chat_id == group_id, Broadcast.status == 'running')
+                .order_by(Broadcast.id)
+                .limit(1)
             )
-            reply = result.scalar_one_or_none()
-            return reply.last_group_message_id if reply else None
+            broadcast = result.scalar_one_or_none()
+            return _broadcast_dict(broadcast) if broadcast else None
         except Exception as e:
-            logger.error(f"Ошибка при получении последнего ответа: {e}")
-            return None
\ No newline at end of file
+            logger.error("Ошибка при получении активной рассылки: %s", e)
+            return None
+
+async def update_broadcast_progress(broadcast_id: int, last_user_id: int, sent: int, blocked: int, failed: int):
+    async with AsyncSessionLocal() as session:
+        try:
+            await session.execute(
+                update(Broadcast)
+                .where(Broadcast.id == broadcast_id)
+                .values(last_user_id=last_user_id, sent=sent, blocked=blocked, failed=failed)
+            )
+            await session.commit()
+        except Exception as e:
+            await session.rollback()
+            logger.error("Ошибка при сохранении прогресса рассылки %s: %s", broadcast_id, e)
+
+async def finish_broadcast(broadcast_id: int, status: str):
+    async with AsyncSessionLocal() as session:
+        try:
+            await session.execute(
+                update(Broadcast)
+                .where(Broadcast.id == broadcast_id)
+                .values(status=status, finished_at=datetime.now())
+            )
+            await session.commit()
+        except Exception as e:
+            await session.rollback()
+            logger.error("Ошибка при завершении рассылки %s: %s", broadcast_id, e)
+
+def _broadcast_dict(broadcast: Broadcast) -> dict:
+    return {
+        "id": broadcast.id,
+        "source_chat_id": broadcast.source_chat_id,
+        "source_message_id": broadcast.source_message_id,
+        "status_chat_id": broadcast.status_chat_id,
+        "status_message_id": broadcast.status_message_id,
+        "last_user_id": broadcast.last_user_id,
+        "total": broadcast.total,
+        "sent": broadcast.sent,
+        "blocked": broadcast.blocked,
+        "failed": broadcast.failed
+    }
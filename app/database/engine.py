@@ -1,6 +1,17 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from contextlib import suppress
+from typing import Awaitable, Callable, Hashable, TypeVar
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from app.config.settings import settings
 
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
 engine = create_async_engine(
     settings.DATABASE_URL,
     echo=False,
@@ -13,4 +24,148 @@ AsyncSessionLocal = async_sessionmaker(
     engine,
     class_=AsyncSession,
     expire_on_commit=False
-)
\ No newline at end of file
+)
+
+replica_engine = create_async_engine(
+    settings.REPLICA_DATABASE_URL,
+    echo=False,
+    pool_size=10,
+    max_overflow=20,
+    pool_pre_ping=True
+) if settings.REPLICA_DATABASE_URL else None
+
+ReplicaSessionLocal = async_sessionmaker(
+    replica_engine,
+    class_=AsyncSession,
+    expire_on_commit=False
+) if replica_engine else None
+
+def _parse_lsn(lsn: str) -> int:
+    high, low = lsn.split('/')
+    return (int(high, 16) << 32) + int(low, 16)
+
+class ReadRouter:
+    def __init__(self, max_lag: float, sticky_seconds: float, check_interval: float, max_sticky: int = 100000):
+        self.enabled = replica_engine is not None
+        self.max_lag = max_lag
+        self.sticky_seconds = sticky_seconds
+        self.check_interval = check_interval
+        self.max_sticky = max_sticky
+        # Реплика считается годной только после первой проверки отставания
+        self.healthy = False
+        self.lag = None
+        self.stats = {"replica_reads": 0, "primary_reads": 0, "miss_fallbacks": 0, "error_fallbacks": 0}
+        # ключ (group_id, user_id) или (group_id,) -> monotonic-время, до которого читаем из основной базы
+        self._sticky: OrderedDict[Hashable, float] = OrderedDict()
+        # (monotonic-время, LSN основной базы): по ним отставание реплики переводится в секунды
+        self._primary_lsns: deque[tuple[float, int]] = deque(maxlen=max(10, int(max_lag / check_interval) * 2 + 2))
+        self._checked = False
+        self._task = None
+
+    def mark_write(self, *keys: Hashable):
+        if not self.enabled:
+            return
+        until = time.monotonic() + self.sticky_seconds
+        for key in keys:
+            self._sticky[key] = until
+            self._sticky.move_to_end(key)
+        while len(self._sticky) > self.max_sticky:
+            self._sticky.popitem(last=False)
+
+    def use_replica(self, key: Hashable = None) -> bool:
+        if not self.enabled or not self.healthy:
+            return False
+        if key is not None:
+            until = self._sticky.get(key)
+            if until is not None:
+                if until > time.monotonic():
+                    return False
+                del self._sticky[key]
+        return True
+
+    async def read(self, key: Hashable, query: Callable[[AsyncSession], Awaitable[T]],
+                   fallback_on_miss: bool = False) -> T:
+        # fallback_on_miss — для данных, которые только добавляются: отсутствие строки
+        # на реплике может означать, что она ещё не доехала
+        if self.use_replica(key):
+            try:
+                async with ReplicaSessionLocal() as session:
+                    result = await query(session)
+                if result is not None or not fallback_on_miss:
+                    self.stats["replica_reads"] += 1
+                    return result
+                self.stats["miss_fallbacks"] += 1
+            except Exception as e:
+                self.stats["error_fallbacks"] += 1
+                self._mark_unhealthy(f"ошибка запроса: {e}")
+
+        self.stats["primary_reads"] += 1
+        async with AsyncSessionLocal() as session:
+            return await query(session)
+
+    def start(self):
+        if self.enabled:
+            self._task = asyncio.create_task(self._monitor(), name="replica-monitor")
+            logger.info("Чтение с реплики %s:%s включено", settings.DB_REPLICA_HOST, settings.DB_REPLICA_PORT)
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    def snapshot(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "healthy": self.healthy,
+            "lag_seconds": round(self.lag, 3) if self.lag is not None else None,
+            **self.stats,
+        }
+
+    async def _monitor(self):
+        while True:
+            try:
+                await self._check()
+            except Exception as e:
+                self._mark_unhealthy(f"проверка не удалась: {e}")
+            self._checked = True
+            await asyncio.sleep(self.check_interval)
+
+    async def _check(self):
+        # Отставание по времени: реплика содержит всё, что было на основной базе в момент
+        # последнего замера, LSN которого она уже воспроизвела
+        async with engine.connect() as conn:
+            primary_lsn = _parse_lsn((await conn.execute(text("SELECT pg_current_wal_lsn()::text"))).scalar_one())
+        now = time.monotonic()
+        self._primary_lsns.append((now, primary_lsn))
+
+        async with replica_engine.connect() as conn:
+            replayed = (await conn.execute(text("SELECT pg_last_wal_replay_lsn()::text"))).scalar_one()
+        if replayed is None:
+            self._mark_unhealthy("сервер не является репликой")
+            return
+        replayed_lsn = _parse_lsn(replayed)
+
+        caught_up_at = None
+        while self._primary_lsns and self._primary_lsns[0][1] <= replayed_lsn:
+            caught_up_at = self._primary_lsns.popleft()[0]
+        if caught_up_at is not None:
+            # Оставляем последний догнанный замер: от него считается отставание дальше
+            self._primary_lsns.appendleft((caught_up_at, replayed_lsn))
+            self.lag = now - caught_up_at
+        else:
+            self.lag = now - self._primary_lsns[0][0] + self.check_interval
+
+        if self.lag > self.max_lag:
+            self._mark_unhealthy(f"отставание {self.lag:.1f} с")
+        elif not self.healthy:
+            self.healthy = True
+            logger.info("Реплика доступна, отставание %.1f с", self.lag)
+
+    def _mark_unhealthy(self, reason: str):
+        if self.healthy or not self._checked:
+            logger.warning("Чтение переведено на основную базу: %s", reason)
+        self.healthy = False
+
+read_router = ReadRouter(settings.REPLICA_MAX_LAG, settings.REPLICA_STICKY_SECONDS, settings.REPLICA_CHECK_INTERVAL)
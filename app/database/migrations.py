@@ -0,0 +1,217 @@
+import argparse
+import asyncio
+import logging
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from app.config.settings import settings
+from .engine import engine
+
+logger = logging.getLogger(__name__)
+
+# Целевая схема: натуральные ключи с редакцией (group_id) впереди, без суррогатного id.
+# Колонка group_id добавляется без перезаписи таблицы, индексы строятся CONCURRENTLY,
+# таблица блокируется только на короткую замену ключа. Пока строятся индексы, старая версия
+# бота продолжает работать (её строки получают group_id по умолчанию); после замены ключа нужна новая.
+# Вместе с заменой ключа значение по умолчанию снимается: запись без group_id должна падать,
+# а не молча попадать в редакцию --legacy-group-id. Новые колонки (columns) допускают NULL
+# и добавляются без перезаписи таблицы; старая версия бота их не замечает
+SCHEMA_TABLES = [
+    {
+        "table": "message_mappings",
+        "key": ["group_id", "group_message_id"],
+        "include": ["user_id", "user_message_id"],
+        "columns": {"inline_header": "BOOLEAN"},
+        "drop_indexes": ["idx_group_message", "idx_user_message"],
+        "new_indexes": {
+            "idx_user_message": "(group_id, user_id, user_message_id) INCLUDE (group_message_id)"
+        },
+    },
+    {
+        "table": "banned_users",
+        "key": ["group_id", "user_id"],
+        "include": [],
+        "columns": {},
+        "drop_indexes": [],
+        "new_indexes": {},
+    },
+    {
+        "table": "last_editor_replies",
+        "key": ["group_id", "user_id"],
+        "include": [],
+        "columns": {},
+        "drop_indexes": [],
+        "new_indexes": {},
+    },
+    {
+        "table": "outbox_messages",
+        "key": None,
+        "include": [],
+        "columns": {},
+        "drop_indexes": [],
+        "new_indexes": {},
+    },
+]
+
+async def _table_exists(conn: AsyncConnection, table: str) -> bool:
+    result = await conn.execute(text("SELECT to_regclass(:table)"), {"table": f"public.{table}"})
+    return result.scalar_one() is not None
+
+async def _has_column(conn: AsyncConnection, table: str, column: str) -> bool:
+    result = await conn.execute(text(
+        "SELECT 1 FROM information_schema.columns "
+        "WHERE table_schema = 'public' AND table_name = :table AND column_name = :column"
+    ), {"table": table, "column": column})
+    return result.first() is not None
+
+async def _has_group_id_default(conn: AsyncConnection, table: str) -> bool:
+    result = await conn.execute(text(
+        "SELECT column_default FROM information_schema.columns "
+        "WHERE table_schema = 'public' AND table_name = :table AND column_name = 'group_id'"
+    ), {"table": table})
+    return result.scalar_one_or_none() is not None
+
+async def _drop_group_id_default(conn: AsyncConnection, table: str, lock_timeout: str):
+    if not await _has_group_id_default(conn, table):
+        return
+    logger.info("%s: убираем значение group_id по умолчанию", table)
+    async with engine.begin() as tx:
+        await tx.execute(text(f"SET LOCAL lock_timeout = '{lock_timeout}'"))
+        await tx.execute(text(f"ALTER TABLE public.{table} ALTER COLUMN group_id DROP DEFAULT"))
+
+async def _primary_key(conn: AsyncConnection, table: str) -> list[str]:
+    result = await conn.execute(text(
+        "SELECT a.attname FROM pg_index i "
+        "CROSS JOIN LATERAL unnest(i.indkey) WITH ORDINALITY AS k(attnum, ord) "
+        "JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum "
+        "WHERE i.indrelid = CAST(:table AS regclass) AND i.indisprimary AND k.ord <= i.indnkeyatts "
+        "ORDER BY k.ord"
+    ), {"table": f"public.{table}"})
+    return [row[0] for row in result]
+
+async def _needs_migration(conn: AsyncConnection, spec: dict) -> bool:
+    if not await _table_exists(conn, spec["table"]):
+        return False
+    if not await _has_column(conn, spec["table"], "group_id"):
+        return True
+    for column in spec["columns"]:
+        if not await _has_column(conn, spec["table"], column):
+            return True
+    return spec["key"] is not None and await _primary_key(conn, spec["table"]) != spec["key"]
+
+async def pending_migrations(conn: AsyncConnection) -> list[str]:
+    return [spec["table"] for spec in SCHEMA_TABLES if await _needs_migration(conn, spec)]
+
+async def _constraint_names(conn: AsyncConnection, table: str, contype: str) -> list[str]:
+    result = await conn.execute(text(
+        "SELECT conname FROM pg_constraint "
+        "WHERE conrelid = CAST(:table AS regclass) AND contype = :contype"
+    ), {"table": f"public.{table}", "contype": contype})
+    return [row[0] for row in result]
+
+async def _create_index(conn: AsyncConnection, name: str, statement: str):
+    # Прерванный CREATE INDEX CONCURRENTLY оставляет невалидный индекс — пересоздаём его
+    result = await conn.execute(text(
+        "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "JOIN pg_namespace n ON n.oid = c.relnamespace WHERE n.nspname = 'public' AND c.relname = :name"
+    ), {"name": name})
+    valid = result.scalar_one_or_none()
+    if valid:
+        return
+    if valid is False:
+        await conn.execute(text(f"DROP INDEX CONCURRENTLY public.{name}"))
+    await conn.execute(text(statement))
+
+async def _migrate_table(conn: AsyncConnection, spec: dict, legacy_group_id: int, lock_timeout: str):
+    table = spec["table"]
+    if not await _needs_migration(conn, spec):
+        # Таблицы, переведённые до того, как миграция стала снимать значение по умолчанию
+        if await _table_exists(conn, table):
+            await _drop_group_id_default(conn, table, lock_timeout)
+        logger.info("%s: схема актуальна", table)
+        return
+
+    if not await _has_column(conn, table, "group_id"):
+        if not legacy_group_id:
+            raise SystemExit(f"{table}: укажите --legacy-group-id (GROUP_ID редакции, которой принадлежат данные)")
+        logger.info("%s: добавляем group_id = %s", table, legacy_group_id)
+        # Константное значение по умолчанию хранится в каталоге: таблица не перезаписывается
+        async with engine.begin() as tx:
+            await tx.execute(text(f"SET LOCAL lock_timeout = '{lock_timeout}'"))
+            await tx.execute(text(
+                f"ALTER TABLE public.{table} ADD COLUMN group_id BIGINT NOT NULL DEFAULT {int(legacy_group_id)}"
+            ))
+
+    for column, column_type in spec["columns"].items():
+        if await _has_column(conn, table, column):
+            continue
+        logger.info("%s: добавляем %s", table, column)
+        async with engine.begin() as tx:
+            await tx.execute(text(f"SET LOCAL lock_timeout = '{lock_timeout}'"))
+            await tx.execute(text(f"ALTER TABLE public.{table} ADD COLUMN {column} {column_type}"))
+
+    if spec["key"] is None or await _primary_key(conn, table) == spec["key"]:
+        await _drop_group_id_default(conn, table, lock_timeout)
+        logger.info("%s: готово", table)
+        return
+
+    include = f" INCLUDE ({', '.join(spec['include'])})" if spec["include"] else ""
+    pkey_index = f"{table}_pkey_new"
+
+    logger.info("%s: строим новые индексы", table)
+    await _create_index(
+        conn, pkey_index,
+        f"CREATE UNIQUE INDEX CONCURRENTLY {pkey_index} ON public.{table} ({', '.join(spec['key'])}){include}"
+    )
+    for name, definition in spec["new_indexes"].items():
+        await _create_index(
+            conn, f"{name}_new",
+            f"CREATE INDEX CONCURRENTLY {name}_new ON public.{table} {definition}"
+        )
+
+    old_pkeys = await _constraint_names(conn, table, 'p')
+    old_uniques = await _constraint_names(conn, table, 'u')
+
+    logger.info("%s: меняем первичный ключ", table)
+    async with engine.begin() as tx:
+        await tx.execute(text(f"SET LOCAL lock_timeout = '{lock_timeout}'"))
+        for name in old_pkeys + old_uniques:
+            await tx.execute(text(f'ALTER TABLE public.{table} DROP CONSTRAINT "{name}"'))
+        await tx.execute(text(
+            f"ALTER TABLE public.{table} ADD CONSTRAINT {table}_pkey PRIMARY KEY USING INDEX {pkey_index}"
+        ))
+        for name in spec["drop_indexes"]:
+            await tx.execute(text(f"DROP INDEX IF EXISTS public.{name}"))
+        for name in spec["new_indexes"]:
+            await tx.execute(text(f"ALTER INDEX public.{name}_new RENAME TO {name}"))
+        await tx.execute(text(f"ALTER TABLE public.{table} ALTER COLUMN group_id DROP DEFAULT"))
+        # Удаление колонки не переписывает таблицу; место вернёт --rewrite или pg_repack
+        await tx.execute(text(f"ALTER TABLE public.{table} DROP COLUMN IF EXISTS id"))
+    logger.info("%s: готово", table)
+
+async def migrate_schema(legacy_group_id: int, rewrite: bool = False, lock_timeout: str = '5s'):
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        for spec in SCHEMA_TABLES:
+            await _migrate_table(conn, spec, legacy_group_id, lock_timeout)
+
+        for spec in SCHEMA_TABLES:
+            if not await _table_exists(conn, spec["table"]):
+                continue
+            if rewrite:
+                # VACUUM FULL держит эксклюзивную блокировку — только в окно обслуживания
+                logger.info("%s: VACUUM FULL", spec["table"])
+                await conn.execute(text(f"VACUUM (FULL, ANALYZE) public.{spec['table']}"))
+            else:
+                await conn.execute(text(f"VACUUM (ANALYZE) public.{spec['table']}"))
+    await engine.dispose()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Перевод таблиц на схему с редакциями и покрывающими индексами")
+    parser.add_argument('--legacy-group-id', type=int, default=settings.GROUP_ID,
+                        help="редакция, которой принадлежат существующие строки (по умолчанию GROUP_ID)")
+    parser.add_argument('--rewrite', action='store_true', help="VACUUM FULL после миграции, чтобы вернуть место")
+    parser.add_argument('--lock-timeout', default='5s', help="сколько ждать блокировку при замене ключа")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    asyncio.run(migrate_schema(args.legacy_group_id, rewrite=args.rewrite, lock_timeout=args.lock_timeout))
@@ -1,5 +1,5 @@
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
-from sqlalchemy import Integer, BigInteger, DateTime, Index
+from sqlalchemy import Integer, BigInteger, Boolean, DateTime, Index, PrimaryKeyConstraint, String, Text, JSON, text
 from datetime import datetime
 
 class Base(DeclarativeBase):
@@ -9,30 +9,90 @@ class BannedUser(Base):
     __tablename__ = 'banned_users'
     __table_args__ = {'schema': 'public'}
     
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    user_id: Mapped[int] = mapped_column(BigInteger, unique=True, nullable=False)
+    # group_id — чат редакции: каждая редакция ведёт свой бан-лист
+    group_id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=False)
+    user_id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=False)
     banned_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
     banned_by: Mapped[int] = mapped_column(BigInteger, nullable=True)
 
 class MessageMapping(Base):
     __tablename__ = 'message_mappings'
+    # Оба индекса покрывающие: поиск ответа в обе стороны — index-only scan
     __table_args__ = (
-        Index('idx_user_message', 'user_id', 'user_message_id'),
-        Index('idx_group_message', 'group_message_id'),
+        PrimaryKeyConstraint(
+            'group_id', 'group_message_id',
+            name='message_mappings_pkey',
+            postgresql_include=['user_id', 'user_message_id']
+        ),
+        Index(
+            'idx_user_message', 'group_id', 'user_id', 'user_message_id',
+            postgresql_include=['group_message_id']
+        ),
         {'schema': 'public'}
     )
     
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    group_message_id: Mapped[int] = mapped_column(BigInteger, unique=True, nullable=False)
+    # id сообщений уникальны только внутри чата, поэтому ключи начинаются с редакции
+    group_id: Mapped[int] = mapped_column(BigInteger, autoincrement=False)
+    group_message_id: Mapped[int] = mapped_column(BigInteger, autoincrement=False)
     user_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
     user_message_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    # Шапка в начале текста или подписи копии (True) или отдельным сообщением (False);
+    # по нему правка пересобирается так же, как копия. NULL — маппинги старых версий
+    inline_header: Mapped[bool] = mapped_column(Boolean, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
 
 class LastEditorReply(Base):
     __tablename__ = 'last_editor_replies'
     __table_args__ = {'schema': 'public'}
     
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    user_id: Mapped[int] = mapped_column(BigInteger, unique=True, nullable=False)
+    # last_group_message_id не включён в индекс: строка часто обновляется, и так остаются HOT-обновления
+    group_id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=False)
+    user_id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=False)
     last_group_message_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
-    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now, onupdate=datetime.now)
\ No newline at end of file
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+class OutboxMessage(Base):
+    __tablename__ = 'outbox_messages'
+    __table_args__ = (
+        Index(
+            'idx_outbox_due', 'next_attempt_at',
+            postgresql_where=text("status IN ('pending', 'sending')")
+        ),
+        {'schema': 'public'}
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    # Редакция определяет, каким ботом отправлять
+    group_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    idempotency_key: Mapped[str] = mapped_column(String(128), unique=True, nullable=False)
+    method: Mapped[str] = mapped_column(String(64), nullable=False)
+    payload: Mapped[dict] = mapped_column(JSON, nullable=False)
+    # pending -> sending -> sent | failed
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default='pending')
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.now)
+    last_error: Mapped[str] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
+    sent_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+
+class Broadcast(Base):
+    __tablename__ = 'broadcasts'
+    __table_args__ = {'schema': 'public'}
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    # Чат редакции, из которого копируется сообщение; он же определяет получателей
+    source_chat_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    source_message_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    status_chat_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    status_message_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    # running -> done | cancelled; незавершённая рассылка продолжается после рестарта
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default='running')
+    # Авторы обходятся по возрастанию user_id: всё до last_user_id включительно уже обработано
+    last_user_id: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    total: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    sent: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    blocked: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    failed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    created_by: Mapped[int] = mapped_column(BigInteger, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
+    finished_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
@@ -5,7 +5,8 @@ from .admin import admin_router
 
 main_router = Router()
 main_router.include_router(private_router)
-main_router.include_router(group_router)
+# Команды раньше обработчика ответов: иначе команда, отправленная ответом на сообщение, уйдёт автору
 main_router.include_router(admin_router)
+main_router.include_router(group_router)
 
 __all__ = ['main_router', 'private_router', 'group_router', 'admin_router']
\ No newline at end of file
@@ -1,24 +1,32 @@
 import logging
+from datetime import datetime
 from aiogram import Router, Bot
 from aiogram.filters import Command, CommandObject
-from aiogram.types import Message
+from aiogram.types import Message, BufferedInputFile
 from aiogram.enums import ParseMode
 from app.config.settings import settings
+from app.config.tenants import Tenant
 from app.services import UserService
 from app.services.timeweb_service import TimewebService
+from app.services.broadcast_service import BroadcastService
+from app.services.lifecycle_service import LifecycleService
+from app.services.loop_monitor_service import LoopMonitor
+from app.services.outbox_service import OutboxService
+from app.services.profiler_service import SamplingProfiler
+from app.middlewares import ThrottlingMiddleware
 from app.handlers.common import is_admin
 
 logger = logging.getLogger(__name__)
 admin_router = Router()
 
 @admin_router.message(Command("ban"))
-async def ban_user(message: Message, command: CommandObject, bot: Bot):
-    logger.info(f"Вызвана команда /ban с аргументами: {command.args}")
+async def ban_user(message: Message, command: CommandObject, bot: Bot, tenant: Tenant):
+    logger.info("Вызвана команда /ban с аргументами: %s", command.args)
 
-    if message.chat.id != settings.GROUP_ID:
+    if message.chat.id != tenant.group_id:
         return
 
-    if not await is_admin(bot, message.from_user.id):
+    if not await is_admin(bot, tenant.group_id, message.from_user.id):
         await message.reply("У вас недостаточно прав для выполнения этой команды.")
         return
 
@@ -35,11 +43,11 @@ async def ban_user(message: Message, command: CommandObject, bot: Bot):
             numeric_id = int(user_id_str)
             original_id = str(numeric_id)
 
-        if await UserService.is_banned(numeric_id):
+        if await UserService.is_banned(tenant.group_id, numeric_id):
             await message.reply(f"Пользователь с ID {original_id} уже заблокирован.")
             return
 
-        await UserService.ban_user(numeric_id, message.from_user.id)
+        await UserService.ban_user(tenant.group_id, numeric_id, message.from_user.id)
         
         try:
             await bot.send_message(
@@ -47,23 +55,23 @@ async def ban_user(message: Message, command: CommandObject, bot: Bot):
                 text="Вы были заблокированы администратором журнала. Если вы считаете, что произошла ошибка, пожалуйста, свяжитесь с редакцией другим способом."
             )
         except Exception as e:
-            logger.error(f"Не удалось отправить уведомление о бане пользователю {original_id}: {e}")
+            logger.error("Не удалось отправить уведомление о бане пользователю %s: %s", original_id, e)
 
         await message.reply(f"Пользователь с ID {original_id} успешно заблокирован.")
     except ValueError:
         await message.reply("Некорректный ID пользователя. Формат должен быть '#ID12345' или числовой ID.")
     except Exception as e:
-        logger.error(f"Ошибка при блокировке пользователя: {e}")
+        logger.error("Ошибка при блокировке пользователя: %s", e)
         await message.reply(f"Произошла ошибка при блокировке пользователя: {str(e)}")
 
 @admin_router.message(Command("unban"))
-async def unban_user(message: Message, command: CommandObject, bot: Bot):
-    logger.info(f"Вызвана команда /unban с аргументами: {command.args}")
+async def unban_user(message: Message, command: CommandObject, bot: Bot, tenant: Tenant):
+    logger.info("Вызвана команда /unban с аргументами: %s", command.args)
 
-    if message.chat.id != settings.GROUP_ID:
+    if message.chat.id != tenant.group_id:
         return
 
-    if not await is_admin(bot, message.from_user.id):
+    if not await is_admin(bot, tenant.group_id, message.from_user.id):
         await message.reply("У вас недостаточно прав для выполнения этой команды.")
         return
 
@@ -80,11 +88,11 @@ async def unban_user(message: Message, command: CommandObject, bot: Bot):
             numeric_id = int(user_id_str)
             original_id = str(numeric_id)
 
-        if not await UserService.is_banned(numeric_id):
+        if not await UserService.is_banned(tenant.group_id, numeric_id):
             await message.reply(f"Пользователь с ID {original_id} не был заблокирован.")
             return
 
-        await UserService.unban_user(numeric_id)
+        await UserService.unban_user(tenant.group_id, numeric_id)
 
         try:
             await bot.send_message(
@@ -92,25 +100,25 @@ async def unban_user(message: Message, command: CommandObject, bot: Bot):
                 text="Ваша блокировка была снята администратором журнала. Теперь вы снова можете отправлять свои произведения."
             )
         except Exception as e:
-            logger.error(f"Не удалось отправить уведомление о разбане пользователю {original_id}: {e}")
+            logger.error("Не удалось отправить уведомление о разбане пользователю %s: %s", original_id, e)
 
         await message.reply(f"Пользователь с ID {original_id} успешно разблокирован.")
     except ValueError:
         await message.reply("Некорректный ID пользователя. Формат должен быть '#ID12345' или числовой ID.")
     except Exception as e:
-        logger.error(f"Ошибка при разблокировке пользователя: {e}")
+        logger.error("Ошибка при разблокировке пользователя: %s", e)
         await message.reply(f"Произошла ошибка при разблокировке пользователя: {str(e)}")
 
 @admin_router.message(Command("listbanned"))
-async def list_banned_users(message: Message, bot: Bot):
-    if message.chat.id != settings.GROUP_ID:
+async def list_banned_users(message: Message, bot: Bot, tenant: Tenant):
+    if message.chat.id != tenant.group_id:
         return
     
-    if not await is_admin(bot, message.from_user.id):
+    if not await is_admin(bot, tenant.group_id, message.from_user.id):
         await message.reply("У вас недостаточно прав для выполнения этой команды.")
         return
     
-    banned_users = await UserService.get_all_banned()
+    banned_users = await UserService.get_all_banned(tenant.group_id)
     
     if not banned_users:
         await message.reply("Список забаненных пользователей пуст.")
@@ -123,13 +131,13 @@ async def list_banned_users(message: Message, bot: Bot):
     await message.reply(f"Забаненные пользователи:\n{banned_list}")
 
 @admin_router.message(Command("balance"))
-async def check_balance(message: Message, bot: Bot):
+async def check_balance(message: Message, bot: Bot, tenant: Tenant):
     logger.info("Вызвана команда /balance")
     
-    if message.chat.id != settings.GROUP_ID:
+    if message.chat.id != tenant.group_id:
         return
     
-    if not await is_admin(bot, message.from_user.id):
+    if not await is_admin(bot, tenant.group_id, message.from_user.id):
         await message.reply("У вас недостаточно прав для выполнения этой команды.")
         return
     
@@ -171,4 +179,149 @@ async def check_balance(message: Message, bot: Bot):
     else:
         message_text += "\n✅ Баланс в норме."
     
-    await loading_msg.edit_text(message_text, parse_mode=ParseMode.MARKDOWN)
\ No newline at end of file
+    await loading_msg.edit_text(message_text, parse_mode=ParseMode.MARKDOWN)
+
+@admin_router.message(Command("health"))
+async def check_health(message: Message, bot: Bot, tenant: Tenant, loop_monitor: LoopMonitor,
+                       lifecycle: LifecycleService, outbox: OutboxService, throttling: ThrottlingMiddleware):
+    if message.chat.id != tenant.group_id:
+        return
+
+    if not await is_admin(bot, tenant.group_id, message.from_user.id):
+        await message.reply("У вас недостаточно прав для выполнения этой команды.")
+        return
+
+    loop_stats = loop_monitor.stats()
+    throttling_stats = throttling.stats()
+    pending = await outbox.pending()
+
+    await message.reply(
+        f"🩺 Состояние бота\n\n"
+        f"⏱ Задержка event loop: средняя {loop_stats['lag_avg_ms']} мс, "
+        f"p99 {loop_stats['lag_p99_ms']} мс, максимум {loop_stats['lag_max_ms']} мс\n"
+        f"🧊 Зависаний loop: {loop_stats['stalls']}\n"
+        f"🧵 Задач asyncio: {loop_stats['tasks']}\n"
+        f"📥 Обновлений в обработке: {lifecycle.in_flight}, фоновых задач: {lifecycle.background}\n"
+        f"📬 Outbox: в очереди {pending}, отправлено {outbox.stats['sent']}, "
+        f"повторов {outbox.stats['retried']}, отказов {outbox.stats['failed']}\n"
+        f"🚦 Антифлуд: пропущено {throttling_stats['allowed']}, отклонено {throttling_stats['rejected']}, "
+        f"заглушено {throttling_stats['muted']}"
+    )
+
+@admin_router.message(Command("profile"))
+async def run_profile(message: Message, command: CommandObject, bot: Bot, tenant: Tenant,
+                      profiler: SamplingProfiler, lifecycle: LifecycleService):
+    logger.info("Вызвана команда /profile с аргументами: %s", command.args)
+
+    if message.chat.id != tenant.group_id:
+        return
+
+    if not await is_admin(bot, tenant.group_id, message.from_user.id):
+        await message.reply("У вас недостаточно прав для выполнения этой команды.")
+        return
+
+    try:
+        seconds = int(command.args.strip()) if command.args else 30
+    except ValueError:
+        await message.reply("Укажите длительность в секундах.\nПример: /profile 30")
+        return
+
+    if not 1 <= seconds <= profiler.max_seconds:
+        await message.reply(f"Длительность должна быть от 1 до {profiler.max_seconds} секунд.")
+        return
+
+    refusal = profiler.reserve()
+    if refusal:
+        await message.reply(refusal)
+        return
+
+    try:
+        status_msg = await message.reply(f"🔬 Снимаю профиль за {seconds} с...")
+    except Exception:
+        profiler.release()
+        raise
+    # Профиль снимается в фоне: обработчик не держит обновление всё это время
+    lifecycle.spawn(_send_profile(bot, tenant.group_id, status_msg, profiler, seconds), name="profile")
+
+async def _send_profile(bot: Bot, group_id: int, status_msg: Message, profiler: SamplingProfiler, seconds: int):
+    try:
+        stacks, samples = await profiler.profile(seconds)
+    except Exception as e:
+        logger.error("Ошибка при профилировании: %s", e)
+        await status_msg.edit_text(f"❌ Не удалось снять профиль: {e}")
+        return
+
+    top = "\n".join(f"• {root}: {share:.1f}%" for root, share in SamplingProfiler.summary(stacks))
+    await bot.send_document(
+        chat_id=group_id,
+        document=BufferedInputFile(
+            SamplingProfiler.render(stacks),
+            filename=f"profile-{datetime.now().strftime('%Y%m%d-%H%M%S')}.collapsed"
+        ),
+        caption=(
+            f"Профиль за {seconds} с, сэмплов: {samples}\n\n{top}\n\n"
+            f"Формат collapsed stacks: flamegraph.pl или speedscope.app"
+        ),
+        parse_mode=None,
+        reply_to_message_id=status_msg.message_id
+    )
+    await status_msg.edit_text(f"✅ Профиль за {seconds} с готов.")
+
+@admin_router.message(Command("broadcast"))
+async def start_broadcast(message: Message, command: CommandObject, bot: Bot, tenant: Tenant,
+                          broadcasts: BroadcastService, lifecycle: LifecycleService):
+    logger.info("Вызвана команда /broadcast с аргументами: %s", command.args)
+
+    if message.chat.id != tenant.group_id:
+        return
+
+    if not await is_admin(bot, tenant.group_id, message.from_user.id):
+        await message.reply("У вас недостаточно прав для выполнения этой команды.")
+        return
+
+    if not message.reply_to_message:
+        await message.reply("Ответьте командой /broadcast на сообщение, которое нужно разослать всем авторам.")
+        return
+
+    if broadcasts.is_running:
+        await message.reply("Рассылка уже идёт. Остановить её: /stopbroadcast")
+        return
+
+    # Подсчёт получателей — полный DISTINCT по маппингам: сначала отвечаем, считаем в фоне
+    if (command.args or "").strip() != "confirm":
+        status_msg = await message.reply("📣 Считаю получателей...")
+        lifecycle.spawn(_preview_broadcast(status_msg, broadcasts), name="broadcast-preview")
+        return
+
+    status_msg = await message.reply("📣 Рассылка запускается, считаю получателей...")
+    started = await broadcasts.start(
+        source_message_id=message.reply_to_message.message_id,
+        status_message_id=status_msg.message_id,
+        created_by=message.from_user.id
+    )
+    if not started:
+        await status_msg.edit_text("Рассылка уже идёт. Остановить её: /stopbroadcast")
+
+async def _preview_broadcast(status_msg: Message, broadcasts: BroadcastService):
+    total = await broadcasts.count_recipients()
+    if not total:
+        await status_msg.edit_text("Некому рассылать: авторов пока нет.")
+        return
+    await status_msg.edit_text(
+        f"Сообщение получат {total} авторов (без заблокированных).\n"
+        f"Чтобы начать, ответьте на то же сообщение командой /broadcast confirm"
+    )
+
+@admin_router.message(Command("stopbroadcast"))
+async def stop_broadcast(message: Message, bot: Bot, tenant: Tenant, broadcasts: BroadcastService):
+    if message.chat.id != tenant.group_id:
+        return
+
+    if not await is_admin(bot, tenant.group_id, message.from_user.id):
+        await message.reply("У вас недостаточно прав для выполнения этой команды.")
+        return
+
+    if broadcasts.cancel():
+        await message.reply("Рассылка останавливается.")
+    else:
+        await message.reply("Сейчас рассылка не идёт.")
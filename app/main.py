@@ -1,36 +1,162 @@
 import asyncio
 import logging
+import signal
+from contextlib import suppress
 from aiogram import Bot, Dispatcher
 from aiogram.enums import ParseMode
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
 from app.config.settings import settings
-from app.database import init_db
+from app.config.tenants import load_tenants
+from app.config.logging_config import setup_logging, dropped_records
+from app.database import init_db, engine, read_router
+from app.database.engine import replica_engine
 from app.handlers import main_router
+from app.middlewares import (
+    InFlightMiddleware,
+    UpdateContextMiddleware,
+    HandlerContextMiddleware,
+    ThrottlingMiddleware,
+    TenantMiddleware
+)
+from app.services.backlog_service import BacklogService
+from app.services.broadcast_service import BroadcastService
+from app.services.edit_service import EditCoalescer
+from app.services.health_service import HealthServer
+from app.services.lifecycle_service import LifecycleService
+from app.services.loop_monitor_service import LoopMonitor
 from app.services.monitoring_service import MonitoringService
+from app.services.outbox_service import OutboxService
+from app.services.profiler_service import SamplingProfiler
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 async def main():
+    tenants = load_tenants()
     await init_db()
-    
-    bot = Bot(token=settings.TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+    # Пока реплика не прошла проверку отставания, все чтения идут в основную базу
+    read_router.start()
+
+    # Один процесс обслуживает все редакции: общие HTTP-сессия, пул БД, воркеры и polling
+    session = AiohttpSession()
+    for tenant in tenants:
+        tenant.bot = Bot(token=tenant.token, session=session, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+    bots = [tenant.bot for tenant in tenants]
     dp = Dispatcher()
+
+    lifecycle = LifecycleService()
+    dp["lifecycle"] = lifecycle
+    # Антифлуд стоит до фильтров, обработчиков и квоты редакции: флуд отсекается
+    # без запросов к БД и Bot API и не ждёт в очереди за медленными обработчиками
+    throttling = ThrottlingMiddleware(
+        rate=settings.THROTTLE_RATE,
+        burst=settings.THROTTLE_BURST,
+        mute_after=settings.THROTTLE_MUTE_AFTER,
+        mute_seconds=settings.THROTTLE_MUTE_SECONDS,
+        max_users=settings.THROTTLE_MAX_USERS
+    )
+    dp["throttling"] = throttling
+
+    dp.update.outer_middleware(InFlightMiddleware(lifecycle))
+    dp.update.outer_middleware(UpdateContextMiddleware())
+    dp.update.outer_middleware(throttling)
+    dp.update.outer_middleware(TenantMiddleware(tenants))
+    dp.message.middleware(HandlerContextMiddleware())
+    dp.edited_message.middleware(HandlerContextMiddleware())
+    dp.startup.register(lifecycle.mark_ready)
+
     dp.include_router(main_router)
-    
+
+    outbox = OutboxService({tenant.group_id: tenant.bot for tenant in tenants})
+    dp["outbox"] = outbox
+    await outbox.start()
+
+    for tenant in tenants:
+        # Правки и рассылки у каждой редакции свои; в обработчики их передаёт TenantMiddleware
+        tenant.edits = EditCoalescer(tenant.bot, tenant.group_id, settings.EDIT_QUIET_PERIOD, settings.EDIT_MAX_DELAY)
+        # Рассылка идёт отдельной задачей со своим темпом и не задерживает обработку обновлений
+        tenant.broadcasts = BroadcastService(tenant.bot, tenant.group_id)
+        await tenant.broadcasts.resume()
+
+    loop_monitor = LoopMonitor(settings.LOOP_MONITOR_INTERVAL, settings.LOOP_STALL_THRESHOLD)
+    dp["loop_monitor"] = loop_monitor
+    loop_monitor.start(debug=settings.LOOP_DEBUG)
+
+    profiler = SamplingProfiler(settings.PROFILE_HZ, settings.PROFILE_MAX_SECONDS, settings.PROFILE_COOLDOWN)
+    dp["profiler"] = profiler
+
+    health = HealthServer(lifecycle, settings.HEALTH_HOST, settings.HEALTH_PORT)
+    health.add_stats("loop", loop_monitor.stats)
+    health.add_stats("throttling", throttling.stats)
+    health.add_stats("outbox", lambda: dict(outbox.stats))
+    health.add_stats("edits", lambda: {
+        key: sum(tenant.edits.stats[key] for tenant in tenants) for key in tenants[0].edits.stats
+    })
+    health.add_stats("replica", read_router.snapshot)
+    backlog = BacklogService(dp, settings.BACKLOG_THRESHOLD, settings.BACKLOG_BATCH_SIZE)
+    health.add_stats("backlog", lambda: dict(backlog.stats))
+    health.add_stats("logging", lambda: {"dropped": dropped_records()})
+    await health.start()
+
     # Инициализация мониторинга
-    monitoring = MonitoringService(bot)
-    
+    monitoring = MonitoringService(tenants)
+
     # Запускаем мониторинг в фоне
     monitoring_task = asyncio.create_task(monitoring.monitoring_loop())
-    
+
+    loop = asyncio.get_running_loop()
     try:
-        logger.info("Бот запущен")
-        await dp.start_polling(bot)
+        # Очередь, накопившаяся за простой, разбирается пачками до обычного polling.
+        # Бот уже обрабатывает обновления, поэтому готов; сигналы polling ещё не перехватывает,
+        # так что остановку во время разбора обрабатываем сами
+        lifecycle.mark_ready()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            with suppress(NotImplementedError):
+                loop.add_signal_handler(sig, backlog.stop)
+        try:
+            await backlog.drain(tenants)
+        finally:
+            for sig in (signal.SIGTERM, signal.SIGINT):
+                with suppress(NotImplementedError):
+                    loop.remove_signal_handler(sig)
+
+        if not backlog.stopped:
+            logger.info("Бот запущен, редакций: %d", len(tenants))
+            # Сессию закрываем сами: обработчикам нужно дослать ответы после остановки polling
+            await dp.start_polling(*bots, close_bot_session=False)
     finally:
+        lifecycle.mark_not_ready()
         monitoring.stop()
         monitoring_task.cancel()
-        await bot.session.close()
+
+        # Один срок на всю остановку: ожидания идут подряд, и их сумма вместе с подтверждением
+        # обновлений должна уложиться в stop_grace_period, иначе контейнер получит SIGKILL
+        deadline = loop.time() + settings.SHUTDOWN_TIMEOUT
+
+        def remaining() -> float:
+            return max(0.0, deadline - loop.time())
+
+        await asyncio.gather(*(tenant.broadcasts.stop(remaining()) for tenant in tenants))
+        # Идущий профиль обрывается и отправляется тем, что успел собрать, не занимая весь срок
+        profiler.stop()
+        await lifecycle.drain(remaining())
+        await asyncio.gather(*(tenant.edits.stop(remaining()) for tenant in tenants))
+        await outbox.stop(remaining())
+        await lifecycle.confirm_offsets(bots)
+
+        await health.stop()
+        await loop_monitor.stop()
+        await session.close()
+        await read_router.stop()
+        await engine.dispose()
+        if replica_engine:
+            await replica_engine.dispose()
+        logger.info("Бот остановлен")
 
 if __name__ == '__main__':
-    asyncio.run(main())
\ No newline at end of file
+    # Запись логов идёт в отдельном потоке: медленный stdout не блокирует event loop
+    listener = setup_logging()
+    try:
+        asyncio.run(main())
+    finally:
+        listener.stop()
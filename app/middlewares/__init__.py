@@ -0,0 +1,12 @@
+from .inflight import InFlightMiddleware
+from .logging_context import UpdateContextMiddleware, HandlerContextMiddleware
+from .throttling import ThrottlingMiddleware
+from .tenant import TenantMiddleware
+
+__all__ = [
+    'InFlightMiddleware',
+    'UpdateContextMiddleware',
+    'HandlerContextMiddleware',
+    'ThrottlingMiddleware',
+    'TenantMiddleware'
+]
@@ -0,0 +1,21 @@
+from typing import Any, Awaitable, Callable, Dict
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+from app.services.lifecycle_service import LifecycleService
+
+class InFlightMiddleware(BaseMiddleware):
+    def __init__(self, lifecycle: LifecycleService):
+        self.lifecycle = lifecycle
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any]
+    ) -> Any:
+        bot_id = data["bot"].id
+        self.lifecycle.update_started(bot_id, event.update_id)
+        try:
+            return await handler(event, data)
+        finally:
+            self.lifecycle.update_finished(bot_id, event.update_id)
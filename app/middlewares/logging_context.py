@@ -0,0 +1,34 @@
+from typing import Any, Awaitable, Callable, Dict
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+from app.config.logging_config import update_id_var, user_id_var, handler_var
+
+class UpdateContextMiddleware(BaseMiddleware):
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any]
+    ) -> Any:
+        user = data.get("event_from_user")
+        update_token = update_id_var.set(event.update_id)
+        user_token = user_id_var.set(user.id if user else None)
+        try:
+            return await handler(event, data)
+        finally:
+            update_id_var.reset(update_token)
+            user_id_var.reset(user_token)
+
+class HandlerContextMiddleware(BaseMiddleware):
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        handler_object = data.get("handler")
+        token = handler_var.set(handler_object.callback.__name__ if handler_object else None)
+        try:
+            return await handler(event, data)
+        finally:
+            handler_var.reset(token)
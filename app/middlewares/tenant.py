@@ -0,0 +1,30 @@
+from typing import Any, Awaitable, Callable, Dict
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+from app.config.logging_config import tenant_var
+from app.config.tenants import Tenant
+
+class TenantMiddleware(BaseMiddleware):
+    def __init__(self, tenants: list[Tenant]):
+        # bot.id берётся из токена, запроса к Bot API не требует
+        self.tenants = {tenant.bot.id: tenant for tenant in tenants}
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any]
+    ) -> Any:
+        tenant = self.tenants[data["bot"].id]
+        data["tenant"] = tenant
+        data["edits"] = tenant.edits
+        data["broadcasts"] = tenant.broadcasts
+
+        token = tenant_var.set(tenant.name)
+        try:
+            # Своя квота одновременных обновлений у каждой редакции: всплеск у одной
+            # ждёт в её очереди и не занимает соединения с БД, нужные остальным
+            async with tenant.semaphore:
+                return await handler(event, data)
+        finally:
+            tenant_var.reset(token)
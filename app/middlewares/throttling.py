@@ -0,0 +1,103 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+logger = logging.getLogger(__name__)
+
+class _Bucket:
+    __slots__ = ('tokens', 'updated_at', 'strikes', 'muted_until')
+
+    def __init__(self, tokens: float, updated_at: float):
+        self.tokens = tokens
+        self.updated_at = updated_at
+        self.strikes = 0
+        self.muted_until = 0.0
+
+class ThrottlingMiddleware(BaseMiddleware):
+    def __init__(self, rate: float, burst: int, mute_after: int, mute_seconds: float, max_users: int):
+        self.rate = rate
+        self.burst = burst
+        self.mute_after = mute_after
+        self.mute_seconds = mute_seconds
+        self.max_users = max_users
+        # (bot.id, user_id) -> ведро: у каждой редакции свой лимит для автора.
+        # LRU: при переполнении вытесняются давно не писавшие пользователи
+        self._buckets: OrderedDict[tuple[int, int], _Bucket] = OrderedDict()
+        self.counters = {"allowed": 0, "rejected": 0, "muted": 0, "evicted": 0}
+
+    def stats(self) -> dict:
+        return {**self.counters, "tracked_users": len(self._buckets)}
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any]
+    ) -> Any:
+        # Стоит на уровне Update до TenantMiddleware: флуд отсекается, не дожидаясь слота редакции
+        message = event.message
+        if message is None or message.chat.type != "private" or not message.from_user:
+            return await handler(event, data)
+
+        now = time.monotonic()
+        if data.get("backlog"):
+            # Накопившееся за простой бота пришло разом: темп считается по времени отправки,
+            # переведённому в шкалу monotonic, чтобы ведро продолжилось и в обычном polling
+            now -= max(0.0, time.time() - message.date.timestamp())
+
+        result = self._consume((data["bot"].id, message.from_user.id), now)
+        if result == "allowed":
+            self.counters["allowed"] += 1
+            return await handler(event, data)
+
+        self.counters["rejected"] += 1
+        # Предупреждение одно — в момент мута; дальше флуд отбрасывается без запросов к Bot API
+        if result == "muted":
+            self.counters["muted"] += 1
+            # Мут, истёкший ещё во время простоя, не о чем объявлять
+            if now + self.mute_seconds <= time.monotonic():
+                return None
+            logger.warning("Пользователь %s временно заглушён за флуд на %.0f с", message.from_user.id, self.mute_seconds)
+            try:
+                await message.answer(
+                    f"Слишком много сообщений. Бот не будет принимать ваши сообщения "
+                    f"{max(1, round(self.mute_seconds / 60))} мин."
+                )
+            except Exception as e:
+                logger.error("Не удалось предупредить пользователя %s о флуде: %s", message.from_user.id, e)
+        return None
+
+    def _consume(self, key: tuple[int, int], now: float) -> str:
+        # allowed — пропустить, rejected — отказ, muted — отказ, после которого пользователь заглушён
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = _Bucket(float(self.burst), now)
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_users:
+                self._buckets.popitem(last=False)
+                self.counters["evicted"] += 1
+        else:
+            self._buckets.move_to_end(key)
+
+        if bucket.muted_until > now:
+            return "rejected"
+
+        # Время отправки из накопившихся обновлений может отставать от уже учтённого
+        bucket.tokens = min(self.burst, bucket.tokens + max(0.0, now - bucket.updated_at) * self.rate)
+        bucket.updated_at = max(now, bucket.updated_at)
+
+        if bucket.tokens >= 1:
+            bucket.tokens -= 1
+            bucket.strikes = 0
+            return "allowed"
+
+        # Мут только за серию отказов подряд: человек, чуть превысивший
+        # лимит, получит отдельные отказы, но не блокировку
+        bucket.strikes += 1
+        if bucket.strikes >= self.mute_after:
+            bucket.muted_until = now + self.mute_seconds
+            return "muted"
+        return "rejected"
@@ -1,5 +1,5 @@
 from .user_service import UserService
 from .message_service import MessageService
-from .media_service import MediaService
+from .relay_service import RelayService
 
-__all__ = ['UserService', 'MessageService', 'MediaService']
\ No newline at end of file
+__all__ = ['UserService', 'MessageService', 'RelayService']
@@ -0,0 +1,167 @@
+import asyncio
+import logging
+from aiogram import Dispatcher
+from aiogram.types import Update
+from app.config.logging_config import tenant_var
+from app.config.tenants import Tenant
+from app.database import crud
+from app.database.batch import LookupBatch, lookup_batch_var
+
+logger = logging.getLogger(__name__)
+
+# Команды редакции, меняющие доступ автора: должны выполняться в его очереди
+USER_COMMANDS = ("ban", "unban")
+
+class BacklogService:
+    def __init__(self, dp: Dispatcher, threshold: int, batch_size: int):
+        self.dp = dp
+        self.threshold = threshold
+        # getUpdates отдаёт не больше 100 обновлений за запрос
+        self.batch_size = min(batch_size, 100)
+        self.stats = {"batches": 0, "updates": 0, "failed": 0, "mappings": 0}
+        self._stop = asyncio.Event()
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop.is_set()
+
+    def stop(self):
+        # Текущая пачка дорабатывается целиком: её маппинги записываются, а обновления
+        # подтверждаются, поэтому после рестарта ничего не отправится повторно
+        if not self._stop.is_set():
+            logger.info("Получен сигнал остановки, завершаем текущую пачку")
+        self._stop.set()
+
+    async def drain(self, tenants: list[Tenant]):
+        # После простоя обычный polling разбирал бы очередь по одному обновлению с отдельными
+        # запросами к БД на каждое. Здесь накопившееся забирается пачками до обычного polling
+        await asyncio.gather(*(self._drain_tenant(tenant) for tenant in tenants))
+
+    async def _drain_tenant(self, tenant: Tenant):
+        bot = tenant.bot
+        tenant_var.set(tenant.name)
+        try:
+            pending = (await bot.get_webhook_info()).pending_update_count
+        except Exception as e:
+            logger.error("Не удалось узнать число накопившихся обновлений: %s", e)
+            return
+        if pending < self.threshold:
+            return
+
+        logger.info("Накопилось обновлений: %d, обрабатываем пачками по %d", pending, self.batch_size)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        allowed_updates = self.dp.resolve_used_update_types()
+        offset = None
+        processed = 0
+        try:
+            while True:
+                # Запрос с offset подтверждает предыдущую пачку: она уже обработана
+                updates = await bot.get_updates(
+                    offset=offset, limit=self.batch_size, timeout=0, allowed_updates=allowed_updates
+                )
+                if not updates:
+                    break
+                await self._process_batch(tenant, updates)
+                processed += len(updates)
+                offset = updates[-1].update_id + 1
+                # Неполная пачка — очередь разобрана, остальное придёт обычным polling
+                if len(updates) < self.batch_size or self._stop.is_set():
+                    break
+        except Exception as e:
+            logger.error("Пачечная обработка прервана, остаток разберёт обычный polling: %s", e)
+        finally:
+            if offset is not None:
+                try:
+                    await bot.get_updates(offset=offset, limit=1, timeout=0)
+                except Exception as e:
+                    logger.error("Не удалось подтвердить обновления бота %s: %s", bot.id, e)
+
+        logger.info("Накопившиеся обновления обработаны: %d за %.1f с", processed, loop.time() - started)
+
+    async def _process_batch(self, tenant: Tenant, updates: list[Update]):
+        batch = await self._load_batch(tenant.group_id, updates)
+
+        # Обновления одного автора идут строго по порядку, разные авторы — параллельно.
+        # Ответы редакции встают в очередь автора, правки — в очередь исходного сообщения
+        lanes: dict[tuple, list[Update]] = {}
+        message_lanes: dict[tuple[int, int], tuple] = {}
+        for update in updates:
+            lane = self._lane(update, batch, message_lanes)
+            lanes.setdefault(lane, []).append(update)
+
+        token = lookup_batch_var.set(batch)
+        try:
+            await asyncio.gather(*(self._process_lane(tenant, lane) for lane in lanes.values()))
+        finally:
+            lookup_batch_var.reset(token)
+            # Кэш отключается только после записи: фоновые задачи обработчиков
+            # до этого момента видят маппинги пачки в нём
+            if await crud.add_message_mappings(tenant.group_id, batch.new_mappings):
+                self.stats["mappings"] += len(batch.new_mappings)
+            batch.active = False
+            self.stats["batches"] += 1
+
+    @staticmethod
+    async def _load_batch(group_id: int, updates: list[Update]) -> LookupBatch:
+        user_ids, user_messages, group_message_ids = set(), set(), set()
+        for update in updates:
+            message = update.message
+            if message is None or message.from_user is None:
+                continue
+            if message.chat.type == "private":
+                user_ids.add(message.from_user.id)
+                if message.reply_to_message:
+                    user_messages.add((message.from_user.id, message.reply_to_message.message_id))
+            elif message.chat.id == group_id and message.reply_to_message:
+                group_message_ids.add(message.reply_to_message.message_id)
+        return await crud.load_lookup_batch(group_id, user_ids, user_messages, group_message_ids)
+
+    @staticmethod
+    def _lane(update: Update, batch: LookupBatch, message_lanes: dict[tuple[int, int], tuple]) -> tuple:
+        if update.edited_message:
+            message = update.edited_message
+            return message_lanes.get((message.chat.id, message.message_id), ("chat", message.chat.id))
+
+        message = update.message
+        if message is None:
+            return ("update", update.update_id)
+        if message.chat.type == "private":
+            lane = ("user", message.chat.id)
+        else:
+            target = BacklogService._command_target(message)
+            mapping = batch.by_group.get(message.reply_to_message.message_id) if message.reply_to_message else None
+            if target is not None:
+                lane = ("user", target)
+            elif mapping:
+                lane = ("user", mapping["user_id"])
+            else:
+                lane = ("chat", message.chat.id)
+        message_lanes[(message.chat.id, message.message_id)] = lane
+        return lane
+
+    @staticmethod
+    def _command_target(message) -> int:
+        # /ban #ID123 и /unban 123: иначе бан выполнился бы параллельно с очередью автора,
+        # и его следующие сообщения могли бы уйти в редакцию уже после бана
+        if not message.text or not message.text.startswith("/"):
+            return None
+        command, _, args = message.text.partition(" ")
+        if command[1:].split("@", 1)[0] not in USER_COMMANDS:
+            return None
+        args = args.strip()
+        if args.startswith("#ID"):
+            args = args[3:]
+        try:
+            return int(args)
+        except ValueError:
+            return None
+
+    async def _process_lane(self, tenant: Tenant, updates: list[Update]):
+        for update in updates:
+            try:
+                await self.dp.feed_update(tenant.bot, update, backlog=True)
+                self.stats["updates"] += 1
+            except Exception as e:
+                self.stats["failed"] += 1
+                logger.error("Ошибка при обработке обновления %s: %s", update.update_id, e)
@@ -0,0 +1,205 @@
+import asyncio
+import logging
+from contextlib import aclosing, suppress
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramAPIError,
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError
+)
+from app.config.settings import settings
+from app.database import crud
+
+logger = logging.getLogger(__name__)
+
+class BroadcastService:
+    def __init__(self, bot: Bot, group_id: int):
+        self.bot = bot
+        self.group_id = group_id
+        self._task: asyncio.Task = None
+        self._stopping = asyncio.Event()
+        self._cancelled = False
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def count_recipients(self) -> int:
+        return await crud.count_broadcast_recipients(self.group_id)
+
+    async def start(self, source_message_id: int, status_message_id: int, created_by: int) -> bool:
+        # Задача занимает слот до первого await: второй /broadcast confirm получит отказ
+        if self.is_running:
+            return False
+        self._launch(self._start(source_message_id, status_message_id, created_by), "broadcast-start")
+        return True
+
+    async def resume(self):
+        broadcast = await crud.get_active_broadcast(self.group_id)
+        if broadcast:
+            logger.info("Продолжаем рассылку %s после user_id %s", broadcast["id"], broadcast["last_user_id"])
+            self._launch(self._run(broadcast), f"broadcast-{broadcast['id']}")
+
+    def cancel(self) -> bool:
+        if not self.is_running:
+            return False
+        self._cancelled = True
+        self._stopping.set()
+        return True
+
+    async def stop(self, timeout: float):
+        # Рассылка может идти десятки минут: при остановке бота она ставится на паузу
+        # и продолжается с сохранённого места после рестарта
+        if not self.is_running:
+            return
+        self._stopping.set()
+        _, pending = await asyncio.wait([self._task], timeout=timeout)
+        for task in pending:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+
+    def _launch(self, coro, name: str):
+        self._stopping.clear()
+        self._cancelled = False
+        self._task = asyncio.create_task(coro, name=name)
+
+    async def _start(self, source_message_id: int, status_message_id: int, created_by: int):
+        # Подсчёт получателей — DISTINCT по всем маппингам редакции, поэтому он идёт
+        # в задаче рассылки, а обработчик команды отвечает сразу.
+        # Прерванная ошибкой рассылка остаётся running: продолжаем её вместо новой, иначе
+        # после рестарта resume подхватил бы только старшую, а вторая не завершилась бы никогда
+        active = await crud.get_active_broadcast(self.group_id)
+        if active:
+            logger.info("Продолжаем прерванную рассылку %s после user_id %s", active["id"], active["last_user_id"])
+            await self._set_status(
+                status_message_id,
+                f"📣 Сначала продолжается прерванная рассылка #{active['id']}, новую запустите после её завершения."
+            )
+            await self._run(active)
+            return
+
+        total = await self.count_recipients()
+        if not total:
+            await self._set_status(status_message_id, "Некому рассылать: авторов пока нет.")
+            return
+        if self._stopping.is_set():
+            await self._set_status(status_message_id, "📣 Рассылка отменена до начала.")
+            return
+
+        broadcast = await crud.create_broadcast(
+            self.group_id, source_message_id, self.group_id, status_message_id, total, created_by
+        )
+        if not broadcast:
+            await self._set_status(status_message_id, "❌ Не удалось запустить рассылку.")
+            return
+        await self._report(broadcast, {"sent": 0, "blocked": 0, "failed": 0}, "запущена")
+        await self._run(broadcast)
+
+    async def _run(self, broadcast: dict):
+        loop = asyncio.get_running_loop()
+        interval = 1 / settings.BROADCAST_RATE
+        progress = {key: broadcast[key] for key in ("sent", "blocked", "failed")}
+        last_user_id = broadcast["last_user_id"]
+        unsaved = 0
+        next_report = loop.time() + settings.BROADCAST_PROGRESS_INTERVAL
+        state = "завершена"
+
+        try:
+            recipients = crud.iter_broadcast_recipients(self.group_id, last_user_id, settings.BROADCAST_BATCH_SIZE)
+            async with aclosing(recipients):
+                async for user_ids in recipients:
+                    for user_id in user_ids:
+                        started = loop.time()
+                        result = await self._send(broadcast, user_id)
+                        if result is None:
+                            break
+
+                        progress[result] += 1
+                        last_user_id = user_id
+                        unsaved += 1
+                        if unsaved >= settings.BROADCAST_CHECKPOINT_EVERY:
+                            await crud.update_broadcast_progress(broadcast["id"], last_user_id, **progress)
+                            unsaved = 0
+                        if loop.time() >= next_report:
+                            await self._report(broadcast, progress, "идёт")
+                            next_report = loop.time() + settings.BROADCAST_PROGRESS_INTERVAL
+
+                        # Ровный темп вместо пачек: обычная пересылка не упирается в лимит Bot API
+                        if await self._pause(interval - (loop.time() - started)):
+                            break
+                    if self._stopping.is_set():
+                        break
+        except Exception as e:
+            logger.error("Рассылка %s прервана: %s", broadcast["id"], e)
+            state = "прервана из-за ошибки, продолжится после перезапуска или по /broadcast confirm"
+        else:
+            if self._cancelled:
+                state = "отменена"
+            elif self._stopping.is_set():
+                state = "приостановлена, продолжится после перезапуска"
+        finally:
+            await crud.update_broadcast_progress(broadcast["id"], last_user_id, **progress)
+
+        if state in ("завершена", "отменена"):
+            await crud.finish_broadcast(broadcast["id"], "done" if state == "завершена" else "cancelled")
+        logger.info("Рассылка %s %s: %s", broadcast["id"], state, progress)
+        await self._report(broadcast, progress, state)
+
+    async def _send(self, broadcast: dict, user_id: int) -> str:
+        attempt = 0
+        while True:
+            try:
+                await self.bot.copy_message(
+                    chat_id=user_id,
+                    from_chat_id=broadcast["source_chat_id"],
+                    message_id=broadcast["source_message_id"]
+                )
+                return "sent"
+            except TelegramRetryAfter as e:
+                # Flood wait относится ко всему боту, а не к получателю: ждём, не переходя
+                # к следующему автору и не расходуя его попытки
+                logger.warning("Рассылка %s: flood wait %s с", broadcast["id"], e.retry_after)
+                if await self._pause(e.retry_after):
+                    return None
+            except TelegramForbiddenError:
+                return "blocked"
+            except (TelegramNetworkError, TelegramServerError) as e:
+                attempt += 1
+                logger.warning("Рассылка %s: ошибка отправки %s (попытка %s): %s", broadcast["id"], user_id, attempt, e)
+                if attempt >= settings.BROADCAST_MAX_ATTEMPTS:
+                    return "failed"
+                if await self._pause(min(2 ** attempt, 30)):
+                    return None
+            except (TelegramBadRequest, TelegramAPIError) as e:
+                logger.info("Рассылка %s: не доставлено %s: %s", broadcast["id"], user_id, e)
+                return "failed"
+
+    async def _pause(self, seconds: float) -> bool:
+        if seconds > 0:
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._stopping.wait(), seconds)
+        return self._stopping.is_set()
+
+    async def _report(self, broadcast: dict, progress: dict, state: str):
+        await self._set_status(
+            broadcast["status_message_id"],
+            f"📣 Рассылка #{broadcast['id']} {state}\n\n"
+            f"Отправлено: {progress['sent']} из {broadcast['total']}\n"
+            f"Заблокировали бота: {progress['blocked']}\n"
+            f"Ошибок: {progress['failed']}",
+            status_chat_id=broadcast["status_chat_id"]
+        )
+
+    async def _set_status(self, status_message_id: int, text: str, status_chat_id: int = None):
+        try:
+            await self.bot.edit_message_text(
+                chat_id=status_chat_id or self.group_id,
+                message_id=status_message_id,
+                text=text
+            )
+        except Exception as e:
+            logger.debug("Не удалось обновить статус рассылки: %s", e)
@@ -0,0 +1,171 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from contextlib import suppress
+from datetime import datetime, timedelta
+from aiogram import Bot
+from aiogram.enums import ContentType
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+from aiogram.types import Message
+from app.services.message_service import MessageService
+from app.services.relay_service import RelayService
+
+logger = logging.getLogger(__name__)
+
+class _PendingEdit:
+    __slots__ = ("message", "deadline", "hard_deadline")
+
+    def __init__(self, message: Message, deadline: float, hard_deadline: float):
+        self.message = message
+        self.deadline = deadline
+        self.hard_deadline = hard_deadline
+
+class EditCoalescer:
+    TOO_OLD_NOTICE = "Сообщение слишком старое для редактирования. Пожалуйста, свяжитесь с редакцией для уточнения."
+    FAILED_NOTICE = "Сообщение нельзя отредактировать. Пожалуйста, свяжитесь с редакцией для уточнения."
+
+    def __init__(self, bot: Bot, group_id: int, quiet: float, max_delay: float, max_tracked: int = 10000):
+        self.bot = bot
+        self.group_id = group_id
+        self.quiet = quiet
+        self.max_delay = max_delay
+        self.max_tracked = max_tracked
+        self.stats = {"received": 0, "coalesced": 0, "pushed": 0, "skipped": 0}
+        self._pending: dict[int, _PendingEdit] = {}
+        self._tasks: set[asyncio.Task] = set()
+        # group_message_id -> последнее, что ушло автору (текст правки или уведомление), LRU
+        self._delivered: OrderedDict[int, str] = OrderedDict()
+
+    def submit(self, message: Message):
+        # Правка уходит автору после паузы в quiet секунд, но не позже max_delay от первой:
+        # серия исправлений опечаток превращается в один запрос к БД и Bot API
+        self.stats["received"] += 1
+        now = asyncio.get_running_loop().time()
+        pending = self._pending.get(message.message_id)
+        if pending:
+            self.stats["coalesced"] += 1
+            # Обновления приходят по порядку, но устаревшую правку всё равно не берём
+            if (message.edit_date or 0) >= (pending.message.edit_date or 0):
+                pending.message = message
+            pending.deadline = min(now + self.quiet, pending.hard_deadline)
+            return
+
+        self._schedule(message, now + self.quiet, now + self.max_delay)
+
+    async def stop(self, timeout: float):
+        # Отложенные правки отправляются сразу, чтобы не потеряться при остановке
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        pending = list(self._pending)
+        if pending:
+            logger.info("Отправляем отложенные правки: %d", len(pending))
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(asyncio.gather(*(self._flush(mid) for mid in pending)), timeout)
+        # Ожидающие задачи просыпаются не позже чем через quiet секунд и видят, что правка уже ушла
+        if self._tasks:
+            await asyncio.wait(self._tasks, timeout=max(0.0, min(self.quiet, deadline - loop.time())))
+        for task in list(self._tasks):
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+
+    def _schedule(self, message: Message, deadline: float, hard_deadline: float):
+        self._pending[message.message_id] = _PendingEdit(message, deadline, hard_deadline)
+        task = asyncio.create_task(self._wait_and_flush(message.message_id), name=f"edit-{message.message_id}")
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _wait_and_flush(self, group_message_id: int):
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = self._pending.get(group_message_id)
+            if pending is None:
+                return
+            delay = pending.deadline - loop.time()
+            if delay <= 0:
+                break
+            await asyncio.sleep(delay)
+        await self._flush(group_message_id)
+
+    async def _flush(self, group_message_id: int):
+        pending = self._pending.pop(group_message_id, None)
+        if pending is None:
+            return
+        try:
+            await self._push(pending.message)
+        except Exception as e:
+            logger.error("Ошибка при переносе правки %s: %s", group_message_id, e)
+
+    async def _push(self, message: Message):
+        mapping = await MessageService.get_mapping_by_group(self.group_id, message.message_id)
+        if not mapping:
+            logger.debug("Сообщение с ID %s не найдено в отображении.", message.message_id)
+            return
+
+        user_id = mapping["user_id"]
+        user_message_id = mapping["user_message_id"]
+
+        message_date = message.date.replace(tzinfo=None) if message.date.tzinfo else message.date
+        if datetime.now() - message_date > timedelta(hours=48):
+            await self._notify(message.message_id, user_id, self.TOO_OLD_NOTICE)
+            return
+
+        if message.content_type == ContentType.TEXT:
+            method, field = "edit_message_text", "text"
+        elif message.content_type in RelayService.CAPTIONABLE_TYPES:
+            method, field = "edit_message_caption", "caption"
+        else:
+            await self._notify(message.message_id, user_id, self.FAILED_NOTICE)
+            return
+
+        # Правка повторяет вид копии: шапка в начале текста или подписи либо отдельным сообщением.
+        # Длину не пересчитываем: если правка с шапкой не влезет в лимит, Telegram откажет
+        # и автор получит уведомление, а копия не потеряет шапку
+        inline_header = await MessageService.get_inline_header(self.group_id, message.message_id)
+        if inline_header is None:
+            # Маппинги старых версий: вид восстанавливаем по длине, как при пересылке
+            if message.content_type == ContentType.TEXT:
+                content = RelayService.text_with_header(message, RelayService.EDITOR_HEADER)
+            else:
+                content = RelayService.caption_with_header(message, RelayService.EDITOR_HEADER)
+            content = content or message.html_text
+        elif inline_header:
+            content = RelayService.prefixed(message, RelayService.EDITOR_HEADER)
+        else:
+            content = message.html_text
+
+        if self._delivered.get(message.message_id) == content:
+            self.stats["skipped"] += 1
+            return
+
+        try:
+            await getattr(self.bot, method)(chat_id=user_id, message_id=user_message_id, **{field: content})
+        except TelegramRetryAfter as e:
+            if message.message_id not in self._pending:
+                now = asyncio.get_running_loop().time()
+                self._schedule(message, now + e.retry_after, now + e.retry_after)
+            return
+        except TelegramBadRequest as e:
+            if "message is not modified" in str(e):
+                self.stats["skipped"] += 1
+                self._remember(message.message_id, content)
+                return
+            logger.error("Ошибка при редактировании сообщения %s: %s", message.message_id, e)
+            await self._notify(message.message_id, user_id, self.FAILED_NOTICE)
+            return
+
+        self.stats["pushed"] += 1
+        self._remember(message.message_id, content)
+
+    async def _notify(self, group_message_id: int, user_id: int, text: str):
+        # Одно уведомление на сообщение, сколько бы правок ни пришло
+        if self._delivered.get(group_message_id) == text:
+            return
+        self._remember(group_message_id, text)
+        await self.bot.send_message(chat_id=user_id, text=text)
+
+    def _remember(self, group_message_id: int, content: str):
+        self._delivered[group_message_id] = content
+        self._delivered.move_to_end(group_message_id)
+        if len(self._delivered) > self.max_tracked:
+            self._delivered.popitem(last=False)
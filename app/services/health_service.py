@@ -0,0 +1,51 @@
+import logging
+from typing import Callable
+from aiohttp import web
+from app.services.lifecycle_service import LifecycleService
+
+logger = logging.getLogger(__name__)
+
+class HealthServer:
+    def __init__(self, lifecycle: LifecycleService, host: str, port: int):
+        self.lifecycle = lifecycle
+        self.host = host
+        self.port = port
+        self._runner = None
+        self._stats: dict[str, Callable[[], dict]] = {}
+
+    def add_stats(self, name: str, provider: Callable[[], dict]):
+        self._stats[name] = provider
+
+    async def start(self):
+        if not self.port:
+            return
+
+        app = web.Application()
+        app.router.add_get("/live", self.live)
+        app.router.add_get("/ready", self.ready)
+        app.router.add_get("/metrics", self.metrics)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info("Health-сервер запущен на %s:%s", self.host, self.port)
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def live(self, request: web.Request) -> web.Response:
+        return web.json_response({"status": "ok"})
+
+    async def ready(self, request: web.Request) -> web.Response:
+        body = {
+            "ready": self.lifecycle.is_ready,
+            "draining": self.lifecycle.is_draining,
+            "in_flight": self.lifecycle.in_flight,
+            "background": self.lifecycle.background
+        }
+        return web.json_response(body, status=200 if self.lifecycle.is_ready else 503)
+
+    async def metrics(self, request: web.Request) -> web.Response:
+        return web.json_response({name: provider() for name, provider in self._stats.items()})
@@ -0,0 +1,93 @@
+import asyncio
+import logging
+from typing import Any, Coroutine, Iterable
+from aiogram import Bot
+
+logger = logging.getLogger(__name__)
+
+class LifecycleService:
+    def __init__(self):
+        self.is_ready = False
+        self.is_draining = False
+        # bot_id -> update_id обновлений, которые сейчас обрабатываются
+        self._in_flight: dict[int, set[int]] = {}
+        # bot_id -> максимальный update_id, взятый в обработку
+        self._last_update_id: dict[int, int] = {}
+        self._background: set[asyncio.Task] = set()
+
+    def mark_ready(self):
+        # Вызывается и перед разбором накопившейся очереди, и при старте polling
+        if self.is_ready:
+            return
+        self.is_ready = True
+        logger.info("Бот готов принимать обновления")
+
+    def mark_not_ready(self):
+        self.is_ready = False
+        self.is_draining = True
+        logger.info("Бот перестал принимать обновления, начинается завершение")
+
+    @property
+    def in_flight(self) -> int:
+        return sum(len(ids) for ids in self._in_flight.values())
+
+    @property
+    def background(self) -> int:
+        return len(self._background)
+
+    def update_started(self, bot_id: int, update_id: int):
+        self._in_flight.setdefault(bot_id, set()).add(update_id)
+        if update_id > self._last_update_id.get(bot_id, -1):
+            self._last_update_id[bot_id] = update_id
+
+    def update_finished(self, bot_id: int, update_id: int):
+        self._in_flight.get(bot_id, set()).discard(update_id)
+
+    def spawn(self, coro: Coroutine[Any, Any, Any], name: str = None) -> asyncio.Task:
+        task = asyncio.create_task(coro, name=name)
+        self._background.add(task)
+        task.add_done_callback(self._on_background_done)
+        return task
+
+    def _on_background_done(self, task: asyncio.Task):
+        self._background.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error("Ошибка в фоновой задаче %s: %r", task.get_name(), task.exception())
+
+    def safe_offset(self, bot_id: int):
+        # Подтверждать можно только то, что гарантированно обработано:
+        # незавершённые обновления должны прийти повторно после рестарта
+        in_flight = self._in_flight.get(bot_id)
+        if in_flight:
+            return min(in_flight)
+        last_update_id = self._last_update_id.get(bot_id)
+        return last_update_id + 1 if last_update_id is not None else None
+
+    async def drain(self, timeout: float) -> bool:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+
+        while self.in_flight or self._background:
+            if loop.time() >= deadline:
+                logger.warning(
+                    "Не дождались завершения: обработчиков %d, фоновых задач %d",
+                    self.in_flight, len(self._background)
+                )
+                return False
+            await asyncio.sleep(0.1)
+
+        logger.info("Все обработчики и фоновые задачи завершены")
+        return True
+
+    async def confirm_offsets(self, bots: Iterable[Bot]):
+        # Polling подтверждает обновления только следующим getUpdates,
+        # поэтому без явного подтверждения последняя пачка приходит повторно
+        for bot in bots:
+            offset = self.safe_offset(bot.id)
+            if offset is None:
+                continue
+            try:
+                await bot.get_updates(offset=offset, limit=1, timeout=0)
+                logger.info("Подтверждены обновления бота %s до %s", bot.id, offset)
+            except Exception as e:
+                logger.error("Не удалось подтвердить обновления бота %s: %s", bot.id, e)
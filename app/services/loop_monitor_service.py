@@ -0,0 +1,86 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from contextlib import suppress
+
+logger = logging.getLogger(__name__)
+
+class LoopMonitor:
+    def __init__(self, interval: float, stall_threshold: float, window: int = 600):
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.stalls = 0
+        self._lags = deque(maxlen=window)
+        self._max_lag = 0.0
+        self._heartbeat = time.monotonic()
+        self._loop = None
+        self._loop_thread_id = None
+        self._task = None
+        self._watchdog = None
+        self._stopped = threading.Event()
+
+    def start(self, debug: bool = False):
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+
+        if debug:
+            # Штатный отчёт asyncio о медленных колбэках; заметно замедляет loop
+            self._loop.set_debug(True)
+            self._loop.slow_callback_duration = self.stall_threshold
+
+        self._heartbeat = time.monotonic()
+        self._task = asyncio.create_task(self._sample(), name="loop-monitor")
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+        logger.info("Мониторинг event loop запущен: интервал %.2f с, порог %.2f с", self.interval, self.stall_threshold)
+
+    async def stop(self):
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    def stats(self) -> dict:
+        lags = sorted(self._lags)
+        return {
+            "lag_avg_ms": round(sum(lags) / len(lags) * 1000, 2) if lags else 0.0,
+            "lag_p99_ms": round(lags[min(len(lags) - 1, int(len(lags) * 0.99))] * 1000, 2) if lags else 0.0,
+            "lag_max_ms": round(self._max_lag * 1000, 2),
+            "stalls": self.stalls,
+            "tasks": len(asyncio.all_tasks(self._loop)) if self._loop else 0,
+        }
+
+    async def _sample(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            self._heartbeat = time.monotonic()
+            self._lags.append(lag)
+            self._max_lag = max(self._max_lag, lag)
+            if lag > self.stall_threshold:
+                logger.warning("Задержка event loop %.3f с", lag)
+
+    def _watch(self):
+        # Отдельный поток видит loop, даже когда тот заблокирован, и снимает его стек
+        reported = False
+        while not self._stopped.wait(self.interval / 2):
+            blocked_for = time.monotonic() - self._heartbeat - self.interval
+            if blocked_for <= self.stall_threshold:
+                reported = False
+                continue
+            if reported:
+                continue
+
+            reported = True
+            self.stalls += 1
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else "стек недоступен"
+            logger.warning("Event loop заблокирован уже %.2f с, стек:\n%s", blocked_for, stack)
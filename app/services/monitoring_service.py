@@ -3,24 +3,25 @@ import logging
 from datetime import datetime
 from aiogram import Bot
 from app.config.settings import settings
+from app.config.tenants import Tenant
 from app.services.timeweb_service import TimewebService
 
 logger = logging.getLogger(__name__)
 
 class MonitoringService:
-    def __init__(self, bot: Bot):
-        self.bot = bot
+    def __init__(self, tenants: list[Tenant]):
+        # Сервер общий для всех редакций: предупреждаем администраторов каждой
+        self.tenants = tenants
         self.timeweb = TimewebService(settings.TIMEWEB_API_TOKEN)
         self.is_running = False
-        self.group_id = settings.GROUP_ID
     
-    async def get_admin_ids(self) -> list[int]:
+    async def get_admin_ids(self, bot: Bot, group_id: int) -> list[int]:
         try:
-            chat_admins = await self.bot.get_chat_administrators(self.group_id)
+            chat_admins = await bot.get_chat_administrators(group_id)
             admin_ids = [admin.user.id for admin in chat_admins if not admin.user.is_bot]
             return admin_ids
         except Exception as e:
-            logger.error(f"Ошибка при получении списка администраторов: {e}")
+            logger.error("Ошибка при получении списка администраторов: %s", e)
             return []
     
     async def check_and_notify(self):
@@ -38,7 +39,10 @@ class MonitoringService:
         # Используем реальный расход из API
         days_remaining = int(balance / daily_cost) if daily_cost > 0 else 999
         
-        logger.info(f"Проверка баланса: {balance:.2f} {currency}, расход в день: {daily_cost:.2f} {currency}, осталось дней: {days_remaining}")
+        logger.info(
+            "Проверка баланса: %.2f %s, расход в день: %.2f %s, осталось дней: %s",
+            balance, currency, daily_cost, currency, days_remaining
+        )
         
         if days_remaining < 1:
             await self._send_low_balance_alert(balance, currency, days_remaining, daily_cost)
@@ -55,14 +59,15 @@ class MonitoringService:
             f"🕐 Время проверки: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
         )
         
-        admin_ids = await self.get_admin_ids()
-        
-        for admin_id in admin_ids:
-            try:
-                await self.bot.send_message(admin_id, message, parse_mode="Markdown")
-                logger.info(f"Отправлено критическое уведомление администратору {admin_id}")
-            except Exception as e:
-                logger.error(f"Не удалось отправить уведомление админу {admin_id}: {e}")
+        for tenant in self.tenants:
+            admin_ids = await self.get_admin_ids(tenant.bot, tenant.group_id)
+            
+            for admin_id in admin_ids:
+                try:
+                    await tenant.bot.send_message(admin_id, message, parse_mode="Markdown")
+                    logger.info("Отправлено критическое уведомление администратору %s", admin_id)
+                except Exception as e:
+                    logger.error("Не удалось отправить уведомление админу %s: %s", admin_id, e)
     
     async def _send_warning_alert(self, balance: float, currency: str, days: int, daily_cost: float):
         message = (
@@ -74,14 +79,15 @@ class MonitoringService:
             f"🕐 Время проверки: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
         )
         
-        admin_ids = await self.get_admin_ids()
-        
-        for admin_id in admin_ids:
-            try:
-                await self.bot.send_message(admin_id, message, parse_mode="Markdown")
-                logger.info(f"Отправлено предупреждение администратору {admin_id}")
-            except Exception as e:
-                logger.error(f"Не удалось отправить уведомление админу {admin_id}: {e}")
+        for tenant in self.tenants:
+            admin_ids = await self.get_admin_ids(tenant.bot, tenant.group_id)
+            
+            for admin_id in admin_ids:
+                try:
+                    await tenant.bot.send_message(admin_id, message, parse_mode="Markdown")
+                    logger.info("Отправлено предупреждение администратору %s", admin_id)
+                except Exception as e:
+                    logger.error("Не удалось отправить уведомление админу %s: %s", admin_id, e)
     
     async def monitoring_loop(self):
         self.is_running = True
@@ -91,7 +97,7 @@ class MonitoringService:
             try:
                 await self.check_and_notify()
             except Exception as e:
-                logger.error(f"Ошибка в цикле мониторинга: {e}")
+                logger.error("Ошибка в цикле мониторинга: %s", e)
             
             # Ждем 24 часа
             await asyncio.sleep(24 * 60 * 60)
@@ -0,0 +1,257 @@
+import asyncio
+import logging
+import random
+from contextlib import asynccontextmanager, suppress
+from datetime import datetime, timedelta
+from aiohttp import ClientError
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramEntityTooLarge,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError
+)
+from app.config.settings import settings
+from app.database import crud
+from app.services.message_service import MessageService
+from app.services.relay_service import RelayService
+
+logger = logging.getLogger(__name__)
+
+class OutboxService:
+    def __init__(self, bots: dict[int, Bot]):
+        # group_id редакции -> её бот; воркеры и пул соединений общие для всех редакций
+        self.bots = bots
+        self.mode = settings.RELAY_MODE
+        self.is_running = False
+        self.stats = {"sent": 0, "queued": 0, "retried": 0, "failed": 0, "purged": 0}
+        self._wakeup = asyncio.Event()
+        self._workers: list[asyncio.Task] = []
+        self._next_purge = 0.0
+        # Незавершённые записи по очередям (чат получателя и автор): пока очередь не пуста,
+        # новые сообщения встают в неё, а не обгоняют отложенные повторы
+        self._queued: dict[tuple, int] = {}
+        self._locks: dict[tuple, list] = {}
+
+    async def relay(self, group_id: int, key: str, method: str, params: dict,
+                    mapping: dict = None, last_reply: dict = None):
+        # mapping: {"user_id", "group_message_id" | "user_message_id"} — недостающий
+        # id сообщения берётся из отправленного сообщения после доставки.
+        # id сообщений в личке у каждого бота свои, поэтому ключ включает редакцию
+        key = f"{group_id}:{key}"
+        payload = {
+            "params": {k: v for k, v in params.items() if v is not None},
+            "mapping": mapping,
+            "last_reply": last_reply
+        }
+
+        if self.mode == "outbox":
+            await self._enqueue(group_id, key, method, payload)
+            return None
+
+        queue = self._queue(group_id, payload)
+        async with self._queue_lock(queue):
+            if self._queued.get(queue):
+                await self._enqueue(group_id, key, method, payload)
+                return None
+            try:
+                return await self._deliver(group_id, method, payload)
+            except Exception as e:
+                if self._is_transient(e):
+                    logger.warning("Отправка %s не удалась, передаём в outbox: %s", key, e)
+                    attempts = self._count_attempt(0, e)
+                    await self._enqueue(
+                        group_id, key, method, payload, attempts=attempts, error=repr(e),
+                        delay=self._backoff(attempts, e)
+                    )
+                else:
+                    self.stats["failed"] += 1
+                    logger.error("Не удалось отправить %s: %s", key, e)
+                return None
+
+    async def start(self):
+        self.is_running = True
+        # Записи, оставшиеся с прошлого запуска, тоже держат порядок своих очередей
+        self._queued = await crud.count_outbox_queues()
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"outbox-worker-{n}")
+            for n in range(settings.OUTBOX_WORKERS)
+        ]
+        logger.info("Запущено воркеров outbox: %s, режим: %s", len(self._workers), self.mode)
+
+    async def stop(self, timeout: float):
+        self.is_running = False
+        self._wakeup.set()
+        if not self._workers:
+            return
+
+        _, pending = await asyncio.wait(self._workers, timeout=timeout)
+        for task in pending:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+        self._workers = []
+        logger.info("Воркеры outbox остановлены")
+
+    async def pending(self) -> int:
+        return await crud.count_pending_outbox()
+
+    async def _enqueue(self, group_id: int, key: str, method: str, payload: dict, attempts: int = 0,
+                       error: str = None, delay: float = 0):
+        added = await crud.add_outbox_message(
+            group_id, key, method, payload,
+            attempts=attempts,
+            next_attempt_at=datetime.now() + timedelta(seconds=delay),
+            last_error=error
+        )
+        if added:
+            queue = self._queue(group_id, payload)
+            self._queued[queue] = self._queued.get(queue, 0) + 1
+            self.stats["queued"] += 1
+            self._wakeup.set()
+        else:
+            logger.debug("Запись %s уже есть в outbox", key)
+
+    async def _deliver(self, group_id: int, method: str, payload: dict):
+        bot = self.bots[group_id]
+        params = payload["params"]
+        if method == "copy_message":
+            sent_message = await RelayService.deliver(bot, params)
+        else:
+            sent_message = await getattr(bot, method)(**params)
+        self.stats["sent"] += 1
+
+        mapping = payload.get("mapping")
+        if mapping:
+            await MessageService.save_mapping(
+                group_id,
+                mapping.get("group_message_id") or sent_message.message_id,
+                mapping["user_id"],
+                mapping.get("user_message_id") or sent_message.message_id,
+                inline_header=not params.get("header")
+            )
+            # Шапка в группе тоже ведёт к автору: редактор может ответить на неё
+            if params.get("header_message_id") and not mapping.get("group_message_id"):
+                await MessageService.save_mapping(
+                    group_id,
+                    params["header_message_id"],
+                    mapping["user_id"],
+                    mapping["user_message_id"]
+                )
+
+        last_reply = payload.get("last_reply")
+        if last_reply:
+            await MessageService.set_last_reply(group_id, last_reply["user_id"], last_reply["group_message_id"])
+
+        return sent_message
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while self.is_running:
+            if loop.time() >= self._next_purge:
+                # Срок следующей очистки сдвигается до await: её выполняет один воркер
+                self._next_purge = loop.time() + settings.OUTBOX_PURGE_INTERVAL
+                await self._purge()
+
+            self._wakeup.clear()
+            rows = await crud.claim_outbox_messages(settings.OUTBOX_BATCH_SIZE, settings.OUTBOX_LEASE_SECONDS)
+            if not rows:
+                with suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self._wakeup.wait(), settings.OUTBOX_POLL_INTERVAL)
+                continue
+
+            for row in rows:
+                await self._process(row)
+
+    async def _purge(self):
+        # Без очистки таблица растёт на каждую пересылку, особенно в режиме outbox
+        sent_before = datetime.now() - timedelta(hours=settings.OUTBOX_RETENTION_HOURS)
+        purged = 0
+        while self.is_running:
+            deleted = await crud.purge_sent_outbox(sent_before, settings.OUTBOX_PURGE_BATCH)
+            purged += deleted
+            if deleted < settings.OUTBOX_PURGE_BATCH:
+                break
+        if purged:
+            self.stats["purged"] += purged
+            logger.info("Из outbox удалено отправленных записей: %s", purged)
+
+    async def _process(self, row: dict):
+        # Доставка «как минимум один раз»: если запись не удалось отметить
+        # отправленной, после истечения аренды она будет отправлена повторно
+        try:
+            await self._deliver(row["group_id"], row["method"], row["payload"])
+        except Exception as e:
+            attempts = self._count_attempt(row["attempts"], e)
+            exhausted = attempts >= settings.OUTBOX_MAX_ATTEMPTS and not isinstance(e, TelegramRetryAfter)
+            if self._is_transient(e) and not exhausted:
+                delay = self._backoff(attempts, e)
+                self.stats["retried"] += 1
+                logger.warning("Повтор %s через %.1f с (попытка %s): %s", row['idempotency_key'], delay, attempts, e)
+                await crud.retry_outbox_message(
+                    row["id"], attempts, datetime.now() + timedelta(seconds=delay), repr(e), row["payload"]
+                )
+            else:
+                self.stats["failed"] += 1
+                logger.error("Доставка %s прекращена после %s попыток: %s", row['idempotency_key'], attempts, e)
+                await crud.fail_outbox_message(row["id"], attempts, repr(e))
+                self._dequeue(row["group_id"], row["payload"])
+            return
+
+        await crud.complete_outbox_message(row["id"])
+        self._dequeue(row["group_id"], row["payload"])
+
+    def _dequeue(self, group_id: int, payload: dict):
+        queue = self._queue(group_id, payload)
+        left = self._queued.get(queue, 0) - 1
+        if left > 0:
+            self._queued[queue] = left
+        else:
+            self._queued.pop(queue, None)
+
+    @staticmethod
+    def _queue(group_id: int, payload: dict) -> tuple:
+        # Тот же ключ, что и в crud.claim_outbox_messages: значения JSON сравниваются как текст
+        mapping = payload.get("mapping") or {}
+        user_id = mapping.get("user_id")
+        return (group_id, str(payload["params"]["chat_id"]), None if user_id is None else str(user_id))
+
+    @asynccontextmanager
+    async def _queue_lock(self, queue: tuple):
+        # Прямые отправки одного автора идут по одной: иначе параллельные обработчики
+        # могли бы разойтись с проверкой очереди
+        entry = self._locks.setdefault(queue, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[queue]
+
+    @staticmethod
+    def _is_transient(error: Exception) -> bool:
+        # Повторяются только сбои сети и сервера Telegram. Прочие ответы Bot API (бан бота,
+        # неверный chat_id и т.п.) и ошибки в коде (например, редакция убрана из TENANTS_FILE)
+        # повтором не исправить
+        if isinstance(error, TelegramEntityTooLarge):
+            return False
+        return isinstance(
+            error,
+            (TelegramRetryAfter, TelegramNetworkError, TelegramServerError, asyncio.TimeoutError, ClientError)
+        )
+
+    @staticmethod
+    def _count_attempt(attempts: int, error: Exception) -> int:
+        # Ожидание по flood control — не неудачная попытка: Telegram сам назвал срок
+        if isinstance(error, TelegramRetryAfter):
+            return attempts
+        return attempts + 1
+
+    @staticmethod
+    def _backoff(attempts: int, error: Exception = None) -> float:
+        if isinstance(error, TelegramRetryAfter):
+            return float(error.retry_after)
+        delay = min(settings.OUTBOX_BASE_DELAY * 2 ** (attempts - 1), settings.OUTBOX_MAX_DELAY)
+        return random.uniform(delay / 2, delay)
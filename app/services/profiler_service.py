@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+from collections import Counter
+from app.config.logging_config import handler_var
+
+logger = logging.getLogger(__name__)
+
+class SamplingProfiler:
+    SWITCH_INTERVAL = 0.0005
+
+    def __init__(self, hz: int, max_seconds: int, cooldown: float):
+        self.hz = hz
+        self.max_seconds = max_seconds
+        self.cooldown = cooldown
+        self.is_running = False
+        self._last_finished = None
+        # Поток сэмплера проверяет его между замерами: при остановке бота профиль
+        # обрывается и не держит завершение event loop до конца длительности
+        self._stop_sampling = threading.Event()
+
+    def reserve(self) -> str:
+        # Слот занимается до первого await: два одновременных /profile не пройдут проверку оба.
+        # Освобождает его profile() или release(), если до профиля дело не дошло
+        if self.is_running:
+            return "Профилирование уже идёт."
+        if self._last_finished is not None:
+            remaining = self.cooldown - (time.monotonic() - self._last_finished)
+            if remaining > 0:
+                return f"Следующий профиль можно снять через {int(remaining) + 1} с."
+        self.is_running = True
+        return None
+
+    def release(self):
+        self.is_running = False
+
+    def stop(self):
+        self._stop_sampling.set()
+
+    async def profile(self, seconds: float) -> tuple[Counter, int]:
+        # Вызывается из event loop после reserve(): снимаем стеки именно его потока.
+        # Интервал переключения сохраняется и восстанавливается один раз на занятый слот
+        loop = asyncio.get_running_loop()
+        thread_id = threading.get_ident()
+        # Сэмплер получает GIL только когда loop его отпускает; без частого
+        # переключения короткие участки CPU-работы почти не попадают в выборку
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(self.SWITCH_INTERVAL)
+        logger.info("Запущено профилирование на %s с", seconds)
+        try:
+            return await asyncio.to_thread(self._sample, loop, thread_id, seconds)
+        finally:
+            sys.setswitchinterval(switch_interval)
+            self.release()
+            self._last_finished = time.monotonic()
+
+    def _sample(self, loop: asyncio.AbstractEventLoop, thread_id: int, seconds: float) -> tuple[Counter, int]:
+        stacks = Counter()
+        samples = 0
+        interval = 1 / self.hz
+        deadline = time.monotonic() + seconds
+
+        while time.monotonic() < deadline:
+            frame = sys._current_frames().get(thread_id)
+            if frame is not None:
+                stacks[";".join(self._task_roots(loop) + self._frames(frame))] += 1
+                samples += 1
+            if self._stop_sampling.wait(interval):
+                break
+
+        return stacks, samples
+
+    @staticmethod
+    def _task_roots(loop: asyncio.AbstractEventLoop) -> list[str]:
+        # Группировка по корутине задачи и обработчику aiogram; при простое текущей задачи нет
+        task = getattr(asyncio.tasks, "_current_tasks", {}).get(loop)
+        if task is None:
+            return ["loop:idle"]
+
+        roots = [f"task:{task.get_coro().__qualname__}"]
+        get_context = getattr(task, "get_context", None)
+        if get_context is not None:
+            handler = get_context().get(handler_var)
+            if handler:
+                roots.append(f"handler:{handler}")
+        return roots
+
+    @staticmethod
+    def _frames(frame) -> list[str]:
+        frames = []
+        while frame is not None:
+            code = frame.f_code
+            frames.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})")
+            frame = frame.f_back
+        frames.reverse()
+        return frames
+
+    @staticmethod
+    def render(stacks: Counter) -> bytes:
+        # Формат collapsed stacks: подходит для flamegraph.pl и speedscope
+        return "\n".join(f"{stack} {count}" for stack, count in stacks.most_common()).encode("utf-8")
+
+    @staticmethod
+    def summary(stacks: Counter, limit: int = 5) -> list[tuple[str, float]]:
+        roots = Counter()
+        for stack, count in stacks.items():
+            parts = stack.split(";")
+            root = next((part for part in parts if part.startswith("handler:")), parts[0])
+            roots[root] += count
+        total = sum(roots.values()) or 1
+        return [(root, count / total * 100) for root, count in roots.most_common(limit)]
@@ -0,0 +1,127 @@
+import html
+import logging
+from aiogram import Bot
+from aiogram.enums import ContentType
+from aiogram.types import Message
+
+logger = logging.getLogger(__name__)
+
+class RelayService:
+    # Типы, которым можно заменить подпись при copy_message: шапка идёт префиксом подписи
+    CAPTIONABLE_TYPES = {
+        ContentType.PHOTO,
+        ContentType.VIDEO,
+        ContentType.DOCUMENT,
+        ContentType.ANIMATION,
+        ContentType.AUDIO,
+        ContentType.VOICE,
+    }
+    # Текст уходит одним сообщением с шапкой в начале. Остальным типам, а также тексту,
+    # который с шапкой не помещается в лимит, шапка отправляется отдельным сообщением,
+    # а копия отвечает на неё
+    COPYABLE_TYPES = CAPTIONABLE_TYPES | {
+        ContentType.TEXT,
+        ContentType.STICKER,
+        ContentType.VIDEO_NOTE,
+        ContentType.CONTACT,
+        ContentType.LOCATION,
+        ContentType.VENUE,
+        ContentType.POLL,
+        ContentType.DICE,
+    }
+    CAPTION_LIMIT = 1024
+    TEXT_LIMIT = 4096
+    EDITOR_HEADER = "Ответ редакции:"
+
+    @staticmethod
+    def author_header(message: Message) -> str:
+        user = message.from_user
+        return (
+            f"Сообщение от {html.escape(user.full_name)} (@{user.username or 'без юзернейма'})\n"
+            f"ID пользователя: #ID{user.id}"
+        )
+
+    @classmethod
+    def build(cls, message: Message, chat_id: int, header: str, reply_to_message_id: int = None) -> dict:
+        params = {
+            "chat_id": chat_id,
+            "from_chat_id": message.chat.id,
+            "message_id": message.message_id,
+            "reply_to_message_id": reply_to_message_id,
+            "header": None,
+            "caption": None,
+            "text": None
+        }
+
+        if message.content_type == ContentType.TEXT:
+            text = cls.text_with_header(message, header)
+            if text:
+                params["text"] = text
+                return params
+        elif message.content_type in cls.CAPTIONABLE_TYPES:
+            caption = cls.caption_with_header(message, header)
+            if caption:
+                params["caption"] = caption
+                return params
+
+        params["header"] = header
+        return params
+
+    @classmethod
+    def caption_with_header(cls, message: Message, header: str) -> str:
+        # None — шапка с подписью не помещается в лимит и отправляется отдельно
+        length = cls._text_length(html.unescape(header))
+        if message.caption:
+            length += 2 + cls._text_length(message.caption)
+        if length > cls.CAPTION_LIMIT:
+            return None
+        return cls.prefixed(message, header)
+
+    @classmethod
+    def text_with_header(cls, message: Message, header: str) -> str:
+        # None — текст с шапкой не помещается в одно сообщение, шапка отправляется отдельно
+        length = cls._text_length(html.unescape(header)) + 2 + cls._text_length(message.text)
+        if length > cls.TEXT_LIMIT:
+            return None
+        return cls.prefixed(message, header)
+
+    @staticmethod
+    def prefixed(message: Message, header: str) -> str:
+        # Медиа без подписи получает подписью одну шапку
+        return f"{header}\n\n{message.html_text}" if message.text or message.caption else header
+
+    @staticmethod
+    async def deliver(bot: Bot, params: dict):
+        reply_to_message_id = params.get("reply_to_message_id")
+        if params.get("text"):
+            return await bot.send_message(
+                chat_id=params["chat_id"],
+                text=params["text"],
+                reply_to_message_id=reply_to_message_id,
+                allow_sending_without_reply=True
+            )
+
+        # header_message_id сохраняется в params, чтобы повтор из outbox
+        # не отправил шапку второй раз
+        if params.get("header") and not params.get("header_message_id"):
+            header = await bot.send_message(
+                chat_id=params["chat_id"],
+                text=params["header"],
+                reply_to_message_id=reply_to_message_id,
+                allow_sending_without_reply=True
+            )
+            params["header_message_id"] = header.message_id
+
+        return await bot.copy_message(
+            chat_id=params["chat_id"],
+            from_chat_id=params["from_chat_id"],
+            message_id=params["message_id"],
+            caption=params.get("caption"),
+            reply_to_message_id=params.get("header_message_id") or reply_to_message_id,
+            allow_sending_without_reply=True
+        )
+
+    @staticmethod
+    def _text_length(text: str) -> int:
+        # Лимиты Telegram считаются в UTF-16
+        return len(text.encode('utf-16-le')) // 2
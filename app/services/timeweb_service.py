@@ -37,10 +37,10 @@ class TimewebService:
                             'raw_data': finances
                         }
                     else:
-                        logger.error(f"Ошибка API Timeweb: {response.status}")
+                        logger.error("Ошибка API Timeweb: %s", response.status)
                         return None
         except Exception as e:
-            logger.error(f"Ошибка при запросе к API Timeweb: {e}")
+            logger.error("Ошибка при запросе к API Timeweb: %s", e)
             return None
     
     async def get_account_status(self) -> Optional[Dict[str, Any]]:
@@ -58,7 +58,7 @@ class TimewebService:
                         return data.get('status', {})
                     return None
         except Exception as e:
-            logger.error(f"Ошибка при получении статуса аккаунта: {e}")
+            logger.error("Ошибка при получении статуса аккаунта: %s", e)
             return None
     
     def calculate_days_remaining(self, balance: float, daily_cost: float) -> int:
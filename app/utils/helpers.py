@@ -5,16 +5,29 @@ from app.config.settings import settings
 
 logger = logging.getLogger(__name__)
 
-def load_welcome_message() -> str:
-    if settings.WELCOME_FILE.exists():
+# Путь к файлу -> (mtime, текст): у каждой редакции свой файл, перечитывается только после изменения
+_welcome_cache: dict[Path, tuple[float, str]] = {}
+
+def load_welcome_message(path: Path = None) -> str:
+    path = path or settings.WELCOME_FILE
+    try:
+        mtime = path.stat().st_mtime
+    except OSError:
+        mtime = None
+
+    if mtime is not None:
+        cached = _welcome_cache.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
         try:
-            with open(settings.WELCOME_FILE, 'r', encoding='utf-8') as f:
+            with open(path, 'r', encoding='utf-8') as f:
                 message = f.read().strip()
                 if message:
-                    logger.info("Приветственное сообщение загружено из файла")
+                    logger.info("Приветственное сообщение загружено из файла %s", path)
+                    _welcome_cache[path] = (mtime, message)
                     return message
         except Exception as e:
-            logger.error(f"Ошибка при чтении файла welcome_message.txt: {e}")
+            logger.error("Ошибка при чтении файла %s: %s", path, e)
     
     logger.warning("Используется стандартное приветственное сообщение")
     return "Вас приветствует редакция журнала смета-на-покаяние"
@@ -33,5 +46,5 @@ def extract_user_id(reply_message: Message) -> int:
 
         return int(id_str)
     except (IndexError, ValueError) as e:
-        logger.error(f"Ошибка при извлечении ID пользователя: {e}")
+        logger.error("Ошибка при извлечении ID пользователя: %s", e)
         raise ValueError("Не удалось извлечь ID пользователя")
\ No newline at end of file
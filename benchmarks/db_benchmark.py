@@ -0,0 +1,272 @@
+import argparse
+import asyncio
+import json
+import logging
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+from app.config.settings import settings
+from app.database import crud, engine, init_db
+
+logger = logging.getLogger("benchmarks.db")
+
+USER_ID_BASE = 1_000_000_000
+GROUP_ID = -1_000_000_000_001
+SEED_CHUNK = 1_000_000
+TABLES = ('message_mappings', 'last_editor_replies', 'banned_users')
+
+class ErrorCounter(logging.Handler):
+    # crud-функции перехватывают исключения и возвращают значение по умолчанию, оставляя
+    # только запись ERROR в логе. Обработчик вызывается синхронно в задаче, где случилась
+    # ошибка, поэтому отказ засчитывается именно той операции, которую она прервала
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.counts: dict[asyncio.Task, int] = {}
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            return
+        self.counts[task] = self.counts.get(task, 0) + 1
+
+error_counter = ErrorCounter()
+
+class Workload:
+    def __init__(self, rows: int, users: int, banned: int, miss_ratio: float):
+        self.rows = rows
+        self.users = users
+        self.banned = banned
+        self.miss_ratio = miss_ratio
+
+    def user_id(self) -> int:
+        if random.random() < self.miss_ratio:
+            return USER_ID_BASE - random.randint(1, 1_000_000)
+        return USER_ID_BASE + random.randrange(self.users)
+
+    def message_id(self) -> int:
+        if random.random() < self.miss_ratio:
+            return self.rows + random.randint(1, 1_000_000)
+        return random.randint(1, self.rows)
+
+    async def get_message_mapping(self):
+        await crud.get_message_mapping(GROUP_ID, self.message_id())
+
+    async def get_user_message_mapping(self):
+        # Строка i принадлежит автору USER_ID_BASE + i % users, см. seed()
+        message_id = self.message_id()
+        await crud.get_user_message_mapping(GROUP_ID, USER_ID_BASE + message_id % self.users, message_id)
+
+    async def is_user_banned(self):
+        await crud.is_user_banned(GROUP_ID, self.user_id())
+
+    async def get_last_editor_reply(self):
+        await crud.get_last_editor_reply(GROUP_ID, self.user_id())
+
+    async def set_last_editor_reply(self):
+        await crud.set_last_editor_reply(GROUP_ID, self.user_id(), self.message_id())
+
+OPERATIONS = (
+    'get_message_mapping',
+    'get_user_message_mapping',
+    'is_user_banned',
+    'get_last_editor_reply',
+    'set_last_editor_reply',
+)
+
+async def seed(rows: int, users: int, banned: int):
+    await init_db()
+    async with engine.begin() as conn:
+        await conn.execute(text(f"TRUNCATE {', '.join(TABLES)}"))
+
+    for start in range(1, rows + 1, SEED_CHUNK):
+        end = min(start + SEED_CHUNK - 1, rows)
+        async with engine.begin() as conn:
+            await conn.execute(text(
+                "INSERT INTO message_mappings (group_id, group_message_id, user_id, user_message_id, created_at) "
+                "SELECT :group_id, i, CAST(:base AS bigint) + i % :users, i, now() - (:rows - i) * interval '1 second' "
+                "FROM generate_series(CAST(:start AS bigint), CAST(:end AS bigint)) AS i"
+            ), {"group_id": GROUP_ID, "base": USER_ID_BASE, "users": users, "rows": rows, "start": start, "end": end})
+        logger.info("message_mappings: %d / %d", end, rows)
+
+    async with engine.begin() as conn:
+        await conn.execute(text(
+            "INSERT INTO last_editor_replies (group_id, user_id, last_group_message_id, updated_at) "
+            "SELECT :group_id, CAST(:base AS bigint) + u, GREATEST(1, CAST(:rows AS bigint) - u), now() "
+            "FROM generate_series(0, :users - 1) AS u"
+        ), {"group_id": GROUP_ID, "base": USER_ID_BASE, "users": users, "rows": rows})
+        await conn.execute(text(
+            "INSERT INTO banned_users (group_id, user_id, banned_at) "
+            "SELECT :group_id, CAST(:base AS bigint) + u, now() FROM generate_series(0, :banned - 1) AS u"
+        ), {"group_id": GROUP_ID, "base": USER_ID_BASE, "banned": min(banned, users)})
+
+    # VACUUM обновляет visibility map: без неё index-only scan всё равно ходит в heap
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        for table in TABLES:
+            await conn.execute(text(f"VACUUM (ANALYZE) {table}"))
+    logger.info("Данные подготовлены")
+
+async def run_level(operation, concurrency: int, duration: float, warmup: float) -> dict:
+    latencies = []
+    errors = 0
+    loop = asyncio.get_running_loop()
+    warmup_until = loop.time() + warmup
+    deadline = warmup_until + duration
+
+    async def worker():
+        nonlocal errors
+        task = asyncio.current_task()
+        try:
+            while loop.time() < deadline:
+                logged = error_counter.counts.get(task, 0)
+                started = time.perf_counter()
+                try:
+                    await operation()
+                except Exception:
+                    errors += 1
+                    continue
+                # Таймаут пула или ошибка БД внутри crud — отказ, а не быстрая успешная операция
+                if error_counter.counts.get(task, 0) != logged:
+                    errors += 1
+                    continue
+                if loop.time() >= warmup_until:
+                    latencies.append(time.perf_counter() - started)
+        finally:
+            error_counter.counts.pop(task, None)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    latencies.sort()
+    count = len(latencies)
+
+    def percentile(p: float) -> float:
+        return round(latencies[min(count - 1, int(count * p))] * 1000, 3) if count else None
+
+    return {
+        "concurrency": concurrency,
+        "ops": count,
+        "errors": errors,
+        "throughput_ops": round(count / duration, 1),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3) if count else None,
+        "p50_ms": percentile(0.50),
+        "p90_ms": percentile(0.90),
+        "p99_ms": percentile(0.99),
+        "max_ms": round(latencies[-1] * 1000, 3) if count else None,
+    }
+
+async def collect_meta(args) -> dict:
+    async with engine.connect() as conn:
+        version = (await conn.execute(text("SHOW server_version"))).scalar_one()
+        sizes = {}
+        for table in TABLES:
+            row = (await conn.execute(text(
+                "SELECT pg_table_size(CAST(:t AS regclass)), pg_indexes_size(CAST(:t AS regclass)), "
+                "(SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:t AS regclass))"
+            ), {"t": f"public.{table}"})).one()
+            sizes[table] = {"table_bytes": row[0], "index_bytes": row[1], "estimated_rows": row[2]}
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        commit = None
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": commit,
+        "postgres_version": version,
+        "database": f"{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}",
+        "pool_size": engine.pool.size(),
+        "rows": args.rows,
+        "users": args.users,
+        "banned": args.banned,
+        "miss_ratio": args.miss_ratio,
+        "duration": args.duration,
+        "tables": sizes,
+    }
+
+def compare(results: list[dict], baseline_path: str, tolerance: float) -> bool:
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {(r["operation"], r["concurrency"]): r for r in json.load(f)["results"]}
+
+    regressed = False
+    for result in results:
+        old = baseline.get((result["operation"], result["concurrency"]))
+        if not old or not old["p99_ms"] or not result["p99_ms"]:
+            continue
+        p99_delta = result["p99_ms"] / old["p99_ms"] - 1
+        tput_delta = result["throughput_ops"] / old["throughput_ops"] - 1 if old["throughput_ops"] else 0
+        mark = ""
+        if p99_delta > tolerance or tput_delta < -tolerance:
+            mark = "  <-- регрессия"
+            regressed = True
+        print(
+            f"{result['operation']:<26} c={result['concurrency']:<4} "
+            f"p99 {old['p99_ms']:>9.3f} -> {result['p99_ms']:>9.3f} мс ({p99_delta:+.0%}), "
+            f"ops/s {old['throughput_ops']:>9.1f} -> {result['throughput_ops']:>9.1f} ({tput_delta:+.0%}){mark}"
+        )
+    return not regressed
+
+async def main(args) -> int:
+    if args.seed:
+        if 'bench' not in settings.DB_NAME and not args.force:
+            print(f"Отказ: --seed очищает таблицы, а база '{settings.DB_NAME}' не похожа на тестовую. "
+                  f"Используйте DB_NAME=*bench* или --force.", file=sys.stderr)
+            return 2
+        await seed(args.rows, args.users, args.banned)
+
+    workload = Workload(args.rows, args.users, args.banned, args.miss_ratio)
+    results = []
+    try:
+        for name in args.operations.split(','):
+            for concurrency in (int(c) for c in args.concurrency.split(',')):
+                result = await run_level(getattr(workload, name), concurrency, args.duration, args.warmup)
+                result["operation"] = name
+                results.append(result)
+                logger.info(
+                    "%-26s c=%-4d %9.1f ops/s  p50 %.3f мс  p99 %.3f мс  ошибок %d",
+                    name, concurrency, result["throughput_ops"], result["p50_ms"] or 0, result["p99_ms"] or 0,
+                    result["errors"]
+                )
+
+        report = {"meta": await collect_meta(args), "results": results}
+    finally:
+        await engine.dispose()
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    logger.info("Результаты записаны в %s", args.output)
+
+    if args.baseline:
+        return 0 if compare(results, args.baseline, args.tolerance) else 1
+    return 0
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Бенчмарк слоя БД на синтетических данных")
+    parser.add_argument('--seed', action='store_true', help="очистить таблицы и заполнить синтетикой")
+    parser.add_argument('--force', action='store_true', help="разрешить --seed для базы без 'bench' в имени")
+    parser.add_argument('--rows', type=int, default=1_000_000, help="строк в message_mappings")
+    parser.add_argument('--users', type=int, default=50_000, help="различных авторов")
+    parser.add_argument('--banned', type=int, default=1_000, help="забаненных авторов")
+    parser.add_argument('--miss-ratio', type=float, default=0.1, help="доля запросов по несуществующим ключам")
+    parser.add_argument('--operations', default=','.join(OPERATIONS))
+    parser.add_argument('--concurrency', default='1,8,32', help="уровни параллелизма через запятую")
+    parser.add_argument('--duration', type=float, default=10, help="секунд замера на каждый уровень")
+    parser.add_argument('--warmup', type=float, default=2, help="секунд прогрева перед замером")
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--baseline', help="JSON предыдущего прогона для сравнения")
+    parser.add_argument('--tolerance', type=float, default=0.15, help="допустимое ухудшение p99/ops")
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    logging.getLogger("app").setLevel(logging.WARNING)
+    logging.getLogger("app.database").addHandler(error_counter)
+    sys.exit(asyncio.run(main(parse_args())))